@@ -1,60 +1,113 @@
-import csv
-import matplotlib.pyplot as plt
-import io
-import base64
-from flask import Flask, render_template, request
+from flask import Flask, abort, make_response, render_template, request, url_for
 import os
 
+import jobs
+import metrics
+import rendering
+from marks_sql import SqlMarksStore
+from marks_store import MarksStore
+from plots import histogram_version, render_histogram
+
 app = Flask(__name__, template_folder='templates', static_folder='static')
+metrics.install(app, 'LAB4')
+PLOT_WAIT = float(os.environ.get('LAB4_PLOT_WAIT', 10))
 
-def load_csv():
-    """Load data from CSV file"""
-    data = []
-    try:
-        with open('data.csv', 'r') as f:
-            reader = csv.DictReader(f)
-            for row in reader:
-                # Strip whitespace from keys and values
-                cleaned_row = {k.strip(): v.strip() for k, v in row.items()}
-                data.append(cleaned_row)
-    except FileNotFoundError:
-        pass
-    return data
+# Job pool processes import this module too (as __mp_main__ under
+# python app.py) but only run plots.render_histogram, so loading the marks,
+# compiling templates and starting the job queue is left to web processes.
+if not jobs.in_pool_process():
+    # Pages are cached by the values they show; see rendering.py
+    renderer = rendering.Renderer(app, 'LAB4')
+
+    # Histograms render in the job pool (see jobs.py), off the web worker's GIL.
+    # The image route waits up to LAB4_PLOT_WAIT seconds for the render and
+    # otherwise answers 202 with the job, as it does at once for clients that
+    # send Prefer: respond-async.
+    job_queue = jobs.JobQueue.from_env(app, 'LAB4')
+    job_queue.register('render_histogram', render_histogram, mimetype='image/png')
+    app.register_blueprint(jobs.blueprint(job_queue))
+
+    # LAB4_MARKS_DATABASE points at a Lab6 database filled by Lab6/ingest_marks.py;
+    # lookups then run as indexed SQL queries instead of against the CSV.
+    if os.environ.get('LAB4_MARKS_DATABASE'):
+        store = SqlMarksStore(os.environ['LAB4_MARKS_DATABASE'])
+    else:
+        store = MarksStore('data.csv', snapshot_path='data.marks')
+    # Rendered PNGs, bounded by total bytes
+    histograms = rendering.LRU(16 * 1024 * 1024, sizeof=len)
+
+    # Load (or memory-map) the marks once at startup rather than on first request
+    store.refresh()
 
 def get_student_details(student_id):
     """Get all courses and marks for a student"""
-    data = load_csv()
-    student_data = [row for row in data if row['Student id'] == student_id]
-    return student_data
+    return store.student_rows(student_id)
 
 def get_course_details(course_id):
     """Get all marks for a course"""
-    data = load_csv()
-    course_data = [row for row in data if row['Course id'] == course_id]
-    return course_data
-
-def generate_histogram(marks, course_id):
-    """Generate histogram for course marks"""
-    plt.figure(figsize=(8, 5))
-    marks_int = [int(m) for m in marks]
-    plt.hist(marks_int, bins=10, color='steelblue', edgecolor='black')
-    plt.xlabel('Marks')
-    plt.ylabel('Frequency')
-    plt.title(f'Histogram for Course {course_id}')
-    plt.grid(axis='y', alpha=0.3)
+    return store.course_rows(course_id)
+
+def get_course_summary(course_id):
+    """Get precomputed mark aggregates for a course"""
+    return store.course_summary(course_id)
+
+def queue_histogram(course_id, counts, edges, version):
+    """Id of the job rendering this version of a course's histogram.
+
+    Jobs are keyed by version, so concurrent requests share one render and
+    a finished job's PNG is reused until the job table is purged.
+    """
+    return job_queue.submit('render_histogram',
+                            {'counts': counts.tolist(), 'edges': edges.tolist(), 'course_id': course_id},
+                            key=f'histogram:{course_id}:{version}')
+
+def generate_histogram(summary, course_id, wait):
+    """Get (version, PNG) for a course's histogram, or (version, job) if it is still rendering"""
+    counts, edges = summary.histogram()
+    version = histogram_version(course_id, counts, edges)
+    png = histograms.get((course_id, version))
+    if png is not None:
+        return version, png
     
-    # Convert plot to base64 string
-    img = io.BytesIO()
-    plt.savefig(img, format='png')
-    img.seek(0)
-    plot_url = base64.b64encode(img.getvalue()).decode()
-    plt.close()
-    return plot_url
+    # The render itself is recorded by the job queue as job:render_histogram
+    with metrics.span('plot_wait'):
+        job = job_queue.wait(queue_histogram(course_id, counts, edges, version), wait)
+    if job['status'] != jobs.SUCCEEDED:
+        return version, job
+    histograms.put((course_id, version), job['result'])
+    return version, job['result']
+
+@app.route('/course/<course_id>/histogram.png')
+def course_histogram(course_id):
+    summary = get_course_summary(course_id)
+    if summary is None:
+        abort(404)
+    
+    wait = 0 if 'respond-async' in request.headers.get('Prefer', '') else PLOT_WAIT
+    try:
+        version, png = generate_histogram(summary, course_id, wait)
+    except jobs.QueueFull:
+        abort(503)
+    if not isinstance(png, bytes):
+        if png['status'] == jobs.FAILED:
+            abort(500)
+        return jobs.accepted(png)
+    response = make_response(png)
+    response.mimetype = 'image/png'
+    response.set_etag(version)
+    response.cache_control.public = True
+    # Versioned URLs never change content; bare ones must be revalidated
+    if request.args.get('v') == version:
+        response.cache_control.max_age = 31536000
+        response.cache_control.immutable = True
+    else:
+        response.cache_control.no_cache = True
+    return response.make_conditional(request)
 
 @app.route('/', methods=['GET', 'POST'])
 def index():
     if request.method == 'GET':
-        return render_template('index.html')
+        return renderer.page('index.html', None)
     
     # POST request
     id_type = request.form.get('ID')
@@ -70,23 +123,24 @@ def index():
             return render_template('error.html', message=f'Student ID "{id_value}" not found.')
         
         total_marks = sum(int(row['Marks']) for row in student_data)
-        return render_template('student_details.html', 
+        version = [(row['Student id'], row['Course id'], row['Marks']) for row in student_data]
+        return renderer.page('student_details.html', version,
                              student_data=student_data, 
                              total_marks=total_marks)
     
     elif id_type == 'course_id':
-        course_data = get_course_details(id_value)
-        if not course_data:
+        summary = get_course_summary(id_value)
+        if summary is None:
             return render_template('error.html', message=f'Course ID "{id_value}" not found.')
         
-        marks = [int(row['Marks']) for row in course_data]
-        avg_marks = sum(marks) / len(marks)
-        max_marks = max(marks)
-        plot_url = generate_histogram(marks, id_value)
+        counts, edges = summary.histogram()
+        plot_url = url_for('course_histogram', course_id=id_value,
+                           v=histogram_version(id_value, counts, edges))
         
-        return render_template('course_details.html',
-                             avg_marks=round(avg_marks, 2),
-                             max_marks=max_marks,
+        avg_marks = round(summary.average, 2)
+        return renderer.page('course_details.html', (avg_marks, summary.max, plot_url),
+                             avg_marks=avg_marks,
+                             max_marks=summary.max,
                              plot_url=plot_url)
     
     else:
@@ -0,0 +1,61 @@
+"""Measure how long it takes to import the Lab4 app and how much memory it uses.
+
+Each scenario runs in a fresh interpreter so import caches do not leak
+between measurements:
+
+    eager    - matplotlib.pyplot imported up front, as app.py used to do
+    lazy     - plain ``import app``; matplotlib loads in the job pool on the first histogram
+
+Usage: python bench_startup.py [--runs N]
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+CHILD = '''
+import json, resource, sys, time
+start = time.perf_counter()
+if {eager!r}:
+    import matplotlib.pyplot
+import app
+elapsed = time.perf_counter() - start
+rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+if sys.platform == 'darwin':
+    rss //= 1024
+print(json.dumps({{'seconds': elapsed, 'max_rss_kb': rss,
+                  'matplotlib': 'matplotlib' in sys.modules}}))
+'''
+
+SCENARIOS = {
+    'eager': (True, {}),
+    'lazy': (False, {}),
+}
+
+
+def measure(eager, extra_env):
+    env = dict(os.environ, **extra_env)
+    out = subprocess.run([sys.executable, '-c', CHILD.format(eager=eager)],
+                         cwd=HERE, env=env, check=True, capture_output=True, text=True)
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--runs', type=int, default=5)
+    args = parser.parse_args()
+
+    print(f'{"scenario":<10} {"import ms (median)":>20} {"max RSS MB":>12} {"matplotlib":>11}')
+    for name, (eager, extra_env) in SCENARIOS.items():
+        samples = [measure(eager, extra_env) for _ in range(args.runs)]
+        seconds = statistics.median(s['seconds'] for s in samples)
+        rss = statistics.median(s['max_rss_kb'] for s in samples) / 1024
+        print(f'{name:<10} {seconds * 1000:>20.1f} {rss:>12.1f} {str(samples[0]["matplotlib"]):>11}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,67 @@
+"""Check that MarksStore skips malformed CSV rows and keeps its aggregates in step.
+
+A row such as ``1001, 2001, absent`` must not stop the store from loading,
+whether it is in the file at startup, appended later, or still the
+unterminated last line, and a snapshot compiled from the same file must
+agree with the CSV. Runs against scratch files and exits non-zero on a
+failure:
+
+    python check_marks.py
+"""
+import os
+import sys
+import tempfile
+
+from marks_store import MarksStore
+from snapshot import compile_snapshot
+
+HEADER = 'Student id, Course id, Marks\n'
+GOOD = '1001, 2001, 56\n1002, 2001, 67\n1001, 2002, 90\n'
+BAD = '1003, 2001, absent\n1004, , 40\n1005, 2001\n'
+
+
+def course_view(store, course_id):
+    rows = store.course_rows(course_id)
+    summary = store.course_summary(course_id)
+    return sorted(row['Marks'] for row in rows), summary and (summary.count, summary.total, summary.max)
+
+
+def check(label, store, expected_2001, expected_1001):
+    failures = 0
+    for name, actual, expected in (
+            ('course 2001', course_view(store, '2001'), expected_2001),
+            ('student 1001', sorted(row['Marks'] for row in store.student_rows('1001')), expected_1001),
+            ('student 1003', store.student_rows('1003'), [])):
+        if actual != expected:
+            failures += 1
+            print(f'FAIL {label}: {name} gave {actual!r}, expected {expected!r}')
+    if not failures:
+        print(f'ok   {label}')
+    return failures
+
+
+def main():
+    scratch = tempfile.mkdtemp()
+    path = os.path.join(scratch, 'data.csv')
+    with open(path, 'w') as f:
+        f.write(HEADER + GOOD[:15] + BAD + GOOD[15:])
+    store = MarksStore(path)
+    failures = check('bad rows at load', store, (['56', '67'], (2, 123, 67)), ['56', '90'])
+
+    with open(path, 'a') as f:
+        f.write(BAD + '1006, 2001, 70\n')
+    failures += check('bad rows appended', store, (['56', '67', '70'], (3, 193, 70)), ['56', '90'])
+
+    with open(path, 'a') as f:
+        f.write('1007, 2001, absent')
+    failures += check('bad unterminated last line', store, (['56', '67', '70'], (3, 193, 70)), ['56', '90'])
+
+    snapshot_path = os.path.join(scratch, 'data.marks')
+    compile_snapshot(path, snapshot_path)
+    failures += check('snapshot', MarksStore(path, snapshot_path=snapshot_path),
+                      (['56', '67', '70'], (3, 193, 70)), ['56', '90'])
+    return 1 if failures else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,84 @@
+import numpy as np
+
+HISTOGRAM_BINS = 10
+
+
+class CourseAggregate:
+    """Running count/sum/min/max of one course's marks.
+
+    Marks are kept as value -> frequency counts, so the 10-bin histogram can
+    be rebuilt over the current min/max range without revisiting any rows.
+    """
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0
+        self.min = None
+        self.max = None
+        self.frequencies = {}
+        self._histogram = None
+
+    @property
+    def average(self):
+        return self.total / self.count
+
+    def add(self, count, total, low, high, values, frequencies):
+        self.count += int(count)
+        self.total += int(total)
+        self.min = int(low) if self.min is None else min(self.min, int(low))
+        self.max = int(high) if self.max is None else max(self.max, int(high))
+        for value, frequency in zip(values.tolist(), frequencies.tolist()):
+            self.frequencies[value] = self.frequencies.get(value, 0) + frequency
+        self._histogram = None
+
+    def merged(self, marks):
+        """Copy of this aggregate with a few extra marks folded in"""
+        other = CourseAggregate()
+        if self.count:
+            values = np.fromiter(self.frequencies, dtype=np.int64)
+            frequencies = np.fromiter(self.frequencies.values(), dtype=np.int64)
+            other.add(self.count, self.total, self.min, self.max, values, frequencies)
+        if marks:
+            values, frequencies = np.unique(np.asarray(marks, dtype=np.int64), return_counts=True)
+            other.add(len(marks), sum(marks), min(marks), max(marks), values, frequencies)
+        return other
+
+    def histogram(self):
+        """(counts, bin_edges) matching ``hist(marks, bins=10)``"""
+        if self._histogram is None:
+            values = np.fromiter(self.frequencies, dtype=np.int64)
+            weights = np.fromiter(self.frequencies.values(), dtype=np.int64)
+            self._histogram = np.histogram(values, bins=HISTOGRAM_BINS, weights=weights)
+        return self._histogram
+
+
+class CourseStats:
+    """Per-course aggregates, updated in bulk as rows are appended"""
+
+    def __init__(self):
+        self.courses = {}
+
+    def add(self, course_ids, marks):
+        if not len(course_ids):
+            return
+        course_ids = np.asarray(course_ids)
+        marks = np.asarray(marks, dtype=np.int64)
+
+        # Sort by (course, mark) so every course is one contiguous run and its
+        # marks are already grouped for the frequency counts below.
+        order = np.lexsort((marks, course_ids))
+        course_ids, marks = course_ids[order], marks[order]
+        courses, starts, counts = np.unique(course_ids, return_index=True, return_counts=True)
+        totals = np.add.reduceat(marks, starts)
+        lows = np.minimum.reduceat(marks, starts)
+        highs = np.maximum.reduceat(marks, starts)
+
+        for i, course_id in enumerate(courses.tolist()):
+            run = marks[starts[i]:starts[i] + counts[i]]
+            values, frequencies = np.unique(run, return_counts=True)
+            # Ids arrive as normalized CSV strings or snapshot ints; lookups use strings
+            aggregate = self.courses.setdefault(str(course_id), CourseAggregate())
+            aggregate.add(counts[i], totals[i], lows[i], highs[i], values, frequencies)
+
+    def get(self, course_id):
+        return self.courses.get(course_id)
@@ -0,0 +1,85 @@
+import pathlib
+import sqlite3
+import threading
+
+import numpy as np
+
+from course_stats import CourseAggregate
+from snapshot import normalize_id
+
+STUDENT_ROWS = '''
+    SELECT s.roll_number, c.course_code, m.marks
+    FROM student s
+    JOIN marks m ON m.student_id = s.student_id
+    JOIN course c ON c.course_id = m.course_id
+    WHERE s.roll_number = ?
+    ORDER BY m.mark_id
+'''
+
+COURSE_ROWS = '''
+    SELECT s.roll_number, c.course_code, m.marks
+    FROM course c
+    JOIN marks m ON m.course_id = c.course_id
+    JOIN student s ON s.student_id = m.student_id
+    WHERE c.course_code = ?
+    ORDER BY m.mark_id
+'''
+
+COURSE_FREQUENCIES = '''
+    SELECT m.marks, COUNT(*)
+    FROM course c
+    JOIN marks m ON m.course_id = c.course_id
+    WHERE c.course_code = ?
+    GROUP BY m.marks
+'''
+
+
+class SqlMarksStore:
+    """Marks read from the Lab6 ``marks`` table instead of the CSV.
+
+    Lookups are indexed queries (student.roll_number and course.course_code
+    are unique, and marks is indexed by student and by course), so nothing is
+    loaded into memory up front. Lab6/ingest_marks.py keeps the table in step
+    with data.csv. Rows come back in the same shape as MarksStore rows, and
+    answers match it: the ingestion stores ids normalized and keeps every
+    row, so lookups normalize the id they are given and see duplicate rows.
+    """
+
+    fieldnames = ['Student id', 'Course id', 'Marks']
+
+    def __init__(self, database_path):
+        self.uri = pathlib.Path(database_path).resolve().as_uri() + '?mode=ro'
+        self._local = threading.local()
+
+    def _connection(self):
+        connection = getattr(self._local, 'connection', None)
+        if connection is None:
+            connection = self._local.connection = sqlite3.connect(self.uri, uri=True)
+        return connection
+
+    def refresh(self):
+        """Nothing to load; the ingestion job keeps the table current"""
+
+    def _rows(self, query, value):
+        return [dict(zip(self.fieldnames, (student, course, str(marks))))
+                for student, course, marks in self._connection().execute(query, (value,))]
+
+    def student_rows(self, student_id):
+        """Rows for one student, in ingestion order"""
+        return self._rows(STUDENT_ROWS, normalize_id(student_id))
+
+    def course_rows(self, course_id):
+        """Rows for one course, in ingestion order"""
+        return self._rows(COURSE_ROWS, normalize_id(course_id))
+
+    def course_summary(self, course_id):
+        """Aggregate marks for one course, or None if it has no rows"""
+        pairs = self._connection().execute(COURSE_FREQUENCIES, (normalize_id(course_id),)).fetchall()
+        if not pairs:
+            return None
+        values = np.array([value for value, _ in pairs], dtype=np.int64)
+        frequencies = np.array([count for _, count in pairs], dtype=np.int64)
+        aggregate = CourseAggregate()
+        aggregate.add(frequencies.sum(), (values * frequencies).sum(), values.min(), values.max(),
+                      values, frequencies)
+        return aggregate
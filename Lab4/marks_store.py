@@ -0,0 +1,140 @@
+import csv
+import io
+import os
+import threading
+
+from course_stats import CourseAggregate, CourseStats
+from metrics import span
+from snapshot import Snapshot, normalize_id, valid_row
+
+
+class MarksStore:
+    """In-memory copy of the marks CSV, indexed by student and course id.
+
+    Ids are stored and matched in the form snapshot.normalize_id gives them,
+    so rows and lookups agree whether a row comes from the CSV, from a
+    snapshot or from SqlMarksStore. Rows failing
+    valid_row (say a mark of "absent") are left out of every index.
+
+    The file is parsed once. On later lookups only the bytes appended since the
+    previous load are read; if the file shrank or was rewritten in place it is
+    parsed again from scratch.
+
+    If ``snapshot_path`` names a snapshot compiled from the current file (see
+    snapshot.py), the rows it covers are served from the memory-mapped
+    snapshot instead of being parsed.
+    """
+
+    def __init__(self, path, snapshot_path=None):
+        self.path = path
+        self.snapshot_path = snapshot_path
+        self._lock = threading.Lock()
+        self._reset()
+
+    def _reset(self):
+        self.snapshot = None
+        self.fieldnames = None
+        self.by_student = {}
+        self.by_course = {}
+        self.stats = CourseStats()
+        # Rows from a final line that has no trailing newline yet. They are
+        # re-read on the next append instead of being indexed.
+        self.tail = []
+        self._offset = 0
+        self._stat = None
+
+    def refresh(self):
+        """Pick up changes to the CSV file since the last call"""
+        try:
+            st = os.stat(self.path)
+        except FileNotFoundError:
+            with self._lock:
+                self._reset()
+            return
+        stat = (st.st_mtime_ns, st.st_size)
+        if stat == self._stat:
+            return
+        with self._lock:
+            if stat == self._stat:
+                return
+            previous = self._stat
+            if previous is None or st.st_size <= previous[1]:
+                self._reset()
+                self._open_snapshot(st)
+            self._read_from_offset()
+            self._stat = stat
+
+    def _open_snapshot(self, st):
+        if not self.snapshot_path:
+            return
+        try:
+            snapshot = Snapshot(self.snapshot_path)
+        except (OSError, ValueError):
+            return
+        if not snapshot.is_fresh_for(st):
+            snapshot.close()
+            return
+
+        with open(self.path, newline='') as f:
+            header = next(csv.reader(f), [])
+        self.fieldnames = [name.strip() for name in header]
+        self.snapshot = snapshot
+        self._offset = snapshot.source_size
+        self.stats.add(snapshot.course, snapshot.marks)
+
+    def _read_from_offset(self):
+        with open(self.path, 'rb') as f:
+            f.seek(self._offset)
+            data = f.read()
+        end = data.rfind(b'\n') + 1
+        complete, partial = data[:end], data[end:]
+        self._offset += len(complete)
+
+        with span('csv_parse'):
+            rows = self._parse(complete.decode())
+            for row in rows:
+                self.by_student.setdefault(row['Student id'], []).append(row)
+                self.by_course.setdefault(row['Course id'], []).append(row)
+            self.stats.add([row['Course id'] for row in rows], [row['Marks'] for row in rows])
+            self.tail = self._parse(partial.decode()) if self.fieldnames else []
+
+    def _parse(self, text):
+        reader = csv.reader(io.StringIO(text, newline=''))
+        if self.fieldnames is None:
+            header = next(reader, None)
+            if header is None:
+                return []
+            self.fieldnames = [name.strip() for name in header]
+        rows = (dict(zip(self.fieldnames, (value.strip() for value in record)))
+                for record in reader if len(record) >= len(self.fieldnames))
+        rows = [row for row in rows if valid_row(row)]
+        for row in rows:
+            row['Student id'] = normalize_id(row['Student id'])
+            row['Course id'] = normalize_id(row['Course id'])
+        return rows
+
+    def student_rows(self, student_id):
+        """Rows for one student, in file order"""
+        self.refresh()
+        student_id = normalize_id(student_id)
+        rows = self.snapshot.student_rows(student_id) if self.snapshot else []
+        rows += self.by_student.get(student_id, [])
+        return rows + [row for row in self.tail if row['Student id'] == student_id]
+
+    def course_rows(self, course_id):
+        """Rows for one course, in file order"""
+        self.refresh()
+        course_id = normalize_id(course_id)
+        rows = self.snapshot.course_rows(course_id) if self.snapshot else []
+        rows += self.by_course.get(course_id, [])
+        return rows + [row for row in self.tail if row['Course id'] == course_id]
+
+    def course_summary(self, course_id):
+        """Aggregate marks for one course, or None if it has no rows"""
+        self.refresh()
+        course_id = normalize_id(course_id)
+        aggregate = self.stats.get(course_id)
+        extra = [int(row['Marks']) for row in self.tail if row['Course id'] == course_id]
+        if extra:
+            return (aggregate or CourseAggregate()).merged(extra)
+        return aggregate
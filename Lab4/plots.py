@@ -0,0 +1,51 @@
+import hashlib
+import io
+import threading
+
+_matplotlib = None
+_matplotlib_lock = threading.Lock()
+
+
+def _load_matplotlib():
+    """Import the plotting stack on first use, pinned to the Agg backend.
+
+    Importing matplotlib costs hundreds of milliseconds and tens of MB, which
+    workers that only answer student lookups should never pay.
+    """
+    global _matplotlib
+    if _matplotlib is None:
+        with _matplotlib_lock:
+            if _matplotlib is None:
+                import matplotlib
+                matplotlib.use('Agg')
+                from matplotlib.backends.backend_agg import FigureCanvasAgg
+                from matplotlib.figure import Figure
+                _matplotlib = (Figure, FigureCanvasAgg)
+    return _matplotlib
+
+
+def histogram_version(course_id, counts, edges):
+    """Short digest of everything that goes into a course's histogram"""
+    key = f'{course_id}|{counts.tolist()}|{edges.tolist()}'
+    return hashlib.sha1(key.encode()).hexdigest()[:16]
+
+
+def render_histogram(counts, edges, course_id):
+    """Render a histogram as PNG bytes.
+
+    Uses a standalone Agg figure rather than pyplot, so concurrent requests
+    never share plotting state.
+    """
+    Figure, FigureCanvasAgg = _load_matplotlib()
+    fig = Figure(figsize=(8, 5))
+    FigureCanvasAgg(fig)
+    ax = fig.add_subplot()
+    ax.hist(edges[:-1], bins=edges, weights=counts, color='steelblue', edgecolor='black')
+    ax.set_xlabel('Marks')
+    ax.set_ylabel('Frequency')
+    ax.set_title(f'Histogram for Course {course_id}')
+    ax.grid(axis='y', alpha=0.3)
+
+    img = io.BytesIO()
+    fig.savefig(img, format='png')
+    return img.getvalue()
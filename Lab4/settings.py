@@ -0,0 +1,17 @@
+"""Environment settings for the lab apps.
+
+Every setting is a ``<PREFIX>_<NAME>`` environment variable, where
+``<PREFIX>`` names the lab (LAB4, LAB5 or LAB6), so labs sharing a shell
+configure separately. Each module documents the names it reads.
+
+Lab4, lab5 and Lab6 each ship a copy of this module; check_shared.py at the
+repository root fails when the copies differ.
+"""
+import os
+
+
+def reader(env_prefix):
+    """``env(name, default)``, returning ``<env_prefix>_<name>`` from the environment or ``default``"""
+    def env(name, default=None):
+        return os.environ.get(f'{env_prefix}_{name}', default)
+    return env
@@ -0,0 +1,151 @@
+"""Columnar binary snapshot of the marks CSV.
+
+The snapshot holds the three CSV columns as int32 arrays sorted by student
+id, plus a course-sorted permutation for course lookups. It is memory-mapped
+read-only, so every worker process shares the same pages and no per-row
+Python objects are created until a lookup actually returns rows.
+
+Usage: python snapshot.py [data.csv] [data.marks]
+"""
+import csv
+import mmap
+import os
+import re
+import struct
+import sys
+from array import array
+
+import numpy as np
+
+MAGIC = b'MRKS'
+VERSION = 1
+# magic, format version, source mtime (ns), source size, row count
+HEADER = struct.Struct('<4sIqQQ')
+COLUMNS = ('student', 'course', 'marks', 'course_sorted', 'course_order')
+INT32 = np.dtype('<i4')
+FIELDS = ('Student id', 'Course id', 'Marks')
+_DECIMAL = re.compile(r'-?[0-9]+')
+
+
+def compile_snapshot(csv_path, snapshot_path):
+    """Convert ``csv_path`` into a snapshot file, replacing it atomically"""
+    st = os.stat(csv_path)
+    students, courses, marks = array('i'), array('i'), array('i')
+    with open(csv_path, newline='') as f:
+        reader = csv.reader(f)
+        header = [name.strip() for name in next(reader)]
+        columns = [header.index(name) for name in FIELDS]
+        for record in reader:
+            if len(record) < len(header):
+                continue
+            row = dict(zip(FIELDS, (record[i].strip() for i in columns)))
+            if not valid_row(row):
+                continue
+            student, course, mark = (int(row[name]) for name in FIELDS)
+            students.append(student)
+            courses.append(course)
+            marks.append(mark)
+
+    student = np.frombuffer(students, dtype=np.intc).astype(INT32)
+    course = np.frombuffer(courses, dtype=np.intc).astype(INT32)
+    mark = np.frombuffer(marks, dtype=np.intc).astype(INT32)
+    # Stable sorts keep file order within each student and each course. The
+    # course permutation points into the student-sorted columns.
+    by_student = np.argsort(student, kind='stable')
+    by_course = np.argsort(course, kind='stable')
+    position = np.empty_like(by_student)
+    position[by_student] = np.arange(len(by_student))
+    course_order = position[by_course].astype(INT32)
+    student, course, mark = student[by_student], course[by_student], mark[by_student]
+
+    tmp_path = snapshot_path + '.tmp'
+    with open(tmp_path, 'wb') as f:
+        f.write(HEADER.pack(MAGIC, VERSION, st.st_mtime_ns, st.st_size, len(student)))
+        for column in (student, course, mark, course[course_order], course_order):
+            f.write(column.tobytes())
+    os.replace(tmp_path, snapshot_path)
+
+
+def valid_row(row):
+    """Whether a parsed CSV row has both ids and an integer mark; other rows are skipped"""
+    return bool(row['Student id'] and row['Course id']) and _DECIMAL.fullmatch(row['Marks']) is not None
+
+
+def normalize_id(value):
+    """Canonical text of a student or course id.
+
+    Decimal ids compare as numbers ("01001" is "1001"), as they do once
+    compiled into a snapshot; anything else is only stripped.
+    """
+    if value.isascii() and value.isdigit() and not value.startswith('0'):
+        return value  # already canonical, as nearly every id is
+    value = value.strip()
+    return str(int(value)) if _DECIMAL.fullmatch(value) else value
+
+
+def _int32_key(value):
+    key = normalize_id(value)
+    if not _DECIMAL.fullmatch(key):
+        return None
+    key = int(key)
+    return key if -2**31 <= key < 2**31 else None
+
+
+class Snapshot:
+    """Read-only, memory-mapped view of a compiled snapshot"""
+
+    def __init__(self, path):
+        with open(path, 'rb') as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            magic, version, self.source_mtime_ns, self.source_size, rows = \
+                HEADER.unpack_from(self._mmap)
+        except struct.error:
+            magic = version = rows = None
+        if (magic, version) != (MAGIC, VERSION) or \
+                len(self._mmap) != HEADER.size + len(COLUMNS) * rows * INT32.itemsize:
+            self._mmap.close()
+            raise ValueError(f'{path} is not a valid version {VERSION} marks snapshot')
+
+        offset = HEADER.size
+        for name in COLUMNS:
+            setattr(self, name, np.frombuffer(self._mmap, dtype=INT32, count=rows, offset=offset))
+            offset += rows * INT32.itemsize
+
+    def is_fresh_for(self, st):
+        """Whether the snapshot was compiled from the file described by ``st``"""
+        return (self.source_mtime_ns, self.source_size) == (st.st_mtime_ns, st.st_size)
+
+    def close(self):
+        for name in COLUMNS:
+            setattr(self, name, None)
+        self._mmap.close()
+
+    def _rows(self, indices):
+        return [{'Student id': str(s), 'Course id': str(c), 'Marks': str(m)}
+                for s, c, m in zip(self.student[indices].tolist(),
+                                   self.course[indices].tolist(),
+                                   self.marks[indices].tolist())]
+
+    def student_rows(self, student_id):
+        key = _int32_key(student_id)
+        if key is None:
+            return []
+        lo = np.searchsorted(self.student, key, 'left')
+        hi = np.searchsorted(self.student, key, 'right')
+        return self._rows(slice(lo, hi))
+
+    def course_rows(self, course_id):
+        key = _int32_key(course_id)
+        if key is None:
+            return []
+        lo = np.searchsorted(self.course_sorted, key, 'left')
+        hi = np.searchsorted(self.course_sorted, key, 'right')
+        return self._rows(self.course_order[lo:hi])
+
+
+if __name__ == '__main__':
+    source = sys.argv[1] if len(sys.argv) > 1 else 'data.csv'
+    target = sys.argv[2] if len(sys.argv) > 2 else os.path.splitext(source)[0] + '.marks'
+    compile_snapshot(source, target)
+    print(f'Wrote {target}')
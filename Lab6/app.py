@@ -1,13 +1,47 @@
-from flask import Flask, request
+import hashlib
+import json
+import os
+from itertools import islice
+
+from flask import Flask, Response, make_response, request, stream_with_context
 from flask_restful import Resource, Api
 from flask_sqlalchemy import SQLAlchemy
+from collections import Counter
+from sqlalchemy import event, inspect
+from sqlalchemy.dialects import postgresql, sqlite
 from sqlalchemy.exc import IntegrityError
+from werkzeug.http import quote_etag
+
+import db_profile
+import jobs
+import metrics
+import serializers
+from cache import make_cache
 
 app = Flask(__name__)
-app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///api_database.sqlite3'
+# Only the dialects in UPSERT_DIALECTS (below) have the upserts and RETURNING used here
+db_profile.configure(app, 'sqlite:///api_database.sqlite3', 'LAB6', dialects=('sqlite', 'postgresql'))
 app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
 db = SQLAlchemy(app)
 api = Api(app)
+metrics.install(app, 'LAB6')
+job_queue = jobs.JobQueue.from_env(app, 'LAB6')
+
+@api.representation('application/json')
+def output_json(data, code, headers=None):
+    """Compact JSON for every resource response (see serializers.py)"""
+    response = make_response(serializers.dumps(data), code)
+    response.headers.extend(headers or {})
+    response.mimetype = 'application/json'
+    return response
+
+def json_response(body, status):
+    """Response for a body that serializers.py has already encoded"""
+    return Response(body, status=status, mimetype='application/json')
+
+with app.app_context():
+    db_profile.install_pragmas(app, db.engine)
+    metrics.instrument_engine(db.engine)
 
 # Database Models
 class Course(db.Model):
@@ -16,7 +50,8 @@ class Course(db.Model):
     course_name = db.Column(db.String, nullable=False)
     course_code = db.Column(db.String, unique=True, nullable=False)
     course_description = db.Column(db.String)
-    enrollments = db.relationship('Enrollment', backref='course', cascade='all, delete-orphan')
+    enrollments = db.relationship('Enrollment', backref='course', cascade='all, delete-orphan', passive_deletes=True)
+    marks = db.relationship('Mark', backref='course', cascade='all, delete-orphan', passive_deletes=True)
 
 class Student(db.Model):
     __tablename__ = 'student'
@@ -24,27 +59,340 @@ class Student(db.Model):
     roll_number = db.Column(db.String, unique=True, nullable=False)
     first_name = db.Column(db.String, nullable=False)
     last_name = db.Column(db.String)
-    enrollments = db.relationship('Enrollment', backref='student', cascade='all, delete-orphan')
+    enrollments = db.relationship('Enrollment', backref='student', cascade='all, delete-orphan', passive_deletes=True)
+    marks = db.relationship('Mark', backref='student', cascade='all, delete-orphan', passive_deletes=True)
 
 class Enrollment(db.Model):
     __tablename__ = 'enrollment'
     enrollment_id = db.Column(db.Integer, primary_key=True, autoincrement=True)
-    student_id = db.Column(db.Integer, db.ForeignKey('student.student_id'), nullable=False)
-    course_id = db.Column(db.Integer, db.ForeignKey('course.course_id'), nullable=False)
+    student_id = db.Column(db.Integer, db.ForeignKey('student.student_id', ondelete='CASCADE'), nullable=False)
+    course_id = db.Column(db.Integer, db.ForeignKey('course.course_id', ondelete='CASCADE'), nullable=False)
+    __table_args__ = (
+        db.Index('ix_enrollment_student_course', 'student_id', 'course_id', unique=True),
+        db.Index('ix_enrollment_course', 'course_id'),
+    )
+
+# Marks ingested from Lab4's data.csv by ingest_marks.py
+class Mark(db.Model):
+    __tablename__ = 'marks'
+    mark_id = db.Column(db.Integer, primary_key=True, autoincrement=True)
+    student_id = db.Column(db.Integer, db.ForeignKey('student.student_id', ondelete='CASCADE'), nullable=False)
+    course_id = db.Column(db.Integer, db.ForeignKey('course.course_id', ondelete='CASCADE'), nullable=False)
+    marks = db.Column(db.Integer, nullable=False)
+    __table_args__ = (
+        # Not unique: a pair listed twice in the CSV keeps both marks
+        db.Index('ix_marks_student_course', 'student_id', 'course_id'),
+        db.Index('ix_marks_course', 'course_id'),
+    )
+
+class IngestWatermark(db.Model):
+    """How far into a source file ingestion has committed"""
+    __tablename__ = 'ingest_watermark'
+    source = db.Column(db.String, primary_key=True)
+    offset = db.Column(db.Integer, nullable=False)
+    checksum = db.Column(db.String, nullable=False)
+    size = db.Column(db.Integer)  # of the file when ingestion last ran
+
+class CourseStats(db.Model):
+    """Per-course enrollment count and marks aggregates, maintained on write"""
+    __tablename__ = 'course_stats'
+    course_id = db.Column(db.Integer, db.ForeignKey('course.course_id', ondelete='CASCADE'), primary_key=True)
+    enrollment_count = db.Column(db.Integer, nullable=False, default=0)
+    marks_count = db.Column(db.Integer, nullable=False, default=0)
+    marks_total = db.Column(db.Integer, nullable=False, default=0)
+    marks_min = db.Column(db.Integer)
+    marks_max = db.Column(db.Integer)
+
+def ensure_indexes():
+    """Create tables, and add indexes and columns to databases made before they existed"""
+    db.create_all()
+    columns = {column['name'] for column in inspect(db.engine).get_columns('ingest_watermark')}
+    if 'size' not in columns:
+        db.session.execute(db.text('ALTER TABLE ingest_watermark ADD COLUMN size INTEGER'))
+        db.session.commit()
+    existing = {index['name'] for index in inspect(db.engine).get_indexes('enrollment')}
+    if 'ix_enrollment_student_course' not in existing:
+        # The unique index cannot be built over duplicate enrollments
+        removed = db.session.execute(db.text(
+            'DELETE FROM enrollment WHERE enrollment_id NOT IN '
+            '(SELECT MIN(enrollment_id) FROM enrollment GROUP BY student_id, course_id)')).rowcount
+        db.session.commit()
+        if removed:
+            app.logger.warning('Removed %d duplicate enrollment rows before creating '
+                               'ix_enrollment_student_course', removed)
+    for index in Enrollment.__table__.indexes:
+        if index.name not in existing:
+            index.create(db.engine)
+    unique = {index['name'] for index in inspect(db.engine).get_indexes('marks') if index['unique']}
+    for index in Mark.__table__.indexes:
+        if index.name in unique and not index.unique:
+            # Made unique by older versions, which kept one mark per pair
+            index.drop(db.engine)
+            index.create(db.engine)
+    if db.session.query(CourseStats.course_id).first() is None:
+        rebuild_course_stats()
+
+# Course statistics
+#
+# course_stats holds one row per course with its enrollment count and marks
+# aggregates, so /api/course/<id>/stats never touches enrollment or marks.
+# Enrollment counts are adjusted by delta in the same transaction as every
+# write: ORM inserts and deletes through the mapper events below, bulk
+# statements (including delete_dependents, which clears out a student or
+# course before it is deleted) by calling adjust_enrollment_counts. Marks aggregates cannot be adjusted by delta once
+# a mark is replaced, so refresh_mark_stats recomputes them for the courses a
+# write touched, using the marks course index.
+UPSERT_DIALECTS = {'sqlite': sqlite.insert, 'postgresql': postgresql.insert}
+
+def ensure_course_stats(connection, course_ids):
+    """Create zeroed course_stats rows for courses that have none"""
+    if course_ids:
+        statement = UPSERT_DIALECTS[connection.dialect.name](CourseStats.__table__).on_conflict_do_nothing()
+        connection.execute(statement, [{'course_id': course_id, 'enrollment_count': 0,
+                                        'marks_count': 0, 'marks_total': 0} for course_id in course_ids])
+
+def adjust_enrollment_counts(connection, deltas):
+    """Add {course_id: change} to the stored enrollment counts"""
+    deltas = {course_id: delta for course_id, delta in deltas.items() if delta}
+    if not deltas:
+        return
+    ensure_course_stats(connection, [course_id for course_id, delta in deltas.items() if delta > 0])
+    table = CourseStats.__table__
+    connection.execute(
+        table.update()
+        .where(table.c.course_id == db.bindparam('stats_course_id'))
+        .values(enrollment_count=table.c.enrollment_count + db.bindparam('delta')),
+        [{'stats_course_id': course_id, 'delta': delta} for course_id, delta in deltas.items()])
+
+def refresh_mark_stats(connection, course_ids=None):
+    """Recompute marks aggregates for ``course_ids`` (all courses when None)"""
+    table, marks = CourseStats.__table__, Mark.__table__
+    def aggregate(function):
+        return db.select(function).where(marks.c.course_id == table.c.course_id).scalar_subquery()
+    statement = table.update().values(
+        marks_count=aggregate(db.func.count()),
+        marks_total=aggregate(db.func.coalesce(db.func.sum(marks.c.marks), 0)),
+        marks_min=aggregate(db.func.min(marks.c.marks)),
+        marks_max=aggregate(db.func.max(marks.c.marks)))
+    if course_ids is not None:
+        statement = statement.where(table.c.course_id.in_(course_ids))
+    connection.execute(statement)
+
+def rebuild_course_stats():
+    """Recompute every course_stats row from scratch (backfills older databases)"""
+    table = CourseStats.__table__
+    enrollments = db.select(db.func.count()).where(Enrollment.course_id == Course.course_id).scalar_subquery()
+    connection = db.session.connection()
+    connection.execute(table.delete())
+    connection.execute(table.insert().from_select(
+        ['course_id', 'enrollment_count', 'marks_count', 'marks_total'],
+        db.select(Course.course_id, enrollments, db.literal(0), db.literal(0))))
+    refresh_mark_stats(connection)
+    db.session.commit()
+
+def delete_dependents(connection, column_name, value):
+    """Bulk-delete the enrollments and marks whose ``column_name`` is ``value``
+
+    Deleting a student or course goes through here first, so the cascade costs
+    two DELETEs and one course_stats update per table rather than statements
+    per row. Databases created before the foreign keys had ON DELETE CASCADE
+    rely on it too.
+    """
+    enrollments, marks = Enrollment.__table__, Mark.__table__
+    course_ids = connection.execute(enrollments.delete().where(enrollments.c[column_name] == value)
+                                    .returning(enrollments.c.course_id)).scalars().all()
+    adjust_enrollment_counts(connection, {course_id: -count for course_id, count in Counter(course_ids).items()})
+    course_ids = connection.execute(marks.delete().where(marks.c[column_name] == value)
+                                    .returning(marks.c.course_id)).scalars().all()
+    if course_ids:
+        refresh_mark_stats(connection, set(course_ids))
+
+@event.listens_for(Enrollment, 'after_insert')
+def enrollment_added(mapper, connection, target):
+    adjust_enrollment_counts(connection, {target.course_id: 1})
+
+@event.listens_for(Enrollment, 'after_delete')
+def enrollment_removed(mapper, connection, target):
+    adjust_enrollment_counts(connection, {target.course_id: -1})
+
+@event.listens_for(Mark, 'after_insert')
+@event.listens_for(Mark, 'after_update')
+@event.listens_for(Mark, 'after_delete')
+def mark_changed(mapper, connection, target):
+    ensure_course_stats(connection, [target.course_id])
+    refresh_mark_stats(connection, [target.course_id])
+
+@event.listens_for(Course, 'after_delete')
+def course_removed(mapper, connection, target):
+    # ON DELETE CASCADE does the same when SQLite enforces foreign keys
+    table = CourseStats.__table__
+    connection.execute(table.delete().where(table.c.course_id == target.course_id))
+
+def course_stats_query():
+    return db.select(Course.course_id, CourseStats.enrollment_count, CourseStats.marks_count,
+                     CourseStats.marks_total, CourseStats.marks_min, CourseStats.marks_max) \
+        .outerjoin(CourseStats, CourseStats.course_id == Course.course_id)
+
+def course_stats_body(row):
+    course_id, enrollment_count, marks_count, marks_total, marks_min, marks_max = row
+    marks = None
+    if marks_count:
+        marks = {'count': marks_count, 'average': marks_total / marks_count, 'min': marks_min, 'max': marks_max}
+    return {'course_id': course_id, 'enrollment_count': enrollment_count or 0, 'marks': marks}
+
+def course_id_filter(req):
+    """Course ids from ?course_id=1,2,3 as a list, [] when absent, or None if malformed"""
+    value = req.args.get('course_id', '')
+    parts = [part.strip() for part in value.split(',') if part.strip()]
+    if not all(part.isdigit() for part in parts):
+        return None
+    return [int(part) for part in parts]
+
+# Listing
+#
+# GET /api/student and /api/course page through records in primary key order
+# using keyset cursors (?after=<last id>&limit=N), so every page is an index
+# range scan however deep the client goes. ?fields=a,b projects columns and
+# exact-match filters are taken from the query string. Asking for NDJSON
+# (?format=ndjson or Accept: application/x-ndjson) streams every remaining
+# record instead of one page.
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 1000
+STREAM_CHUNK_SIZE = 1000
+
+def list_query(model, key, fields, filters, req):
+    """Build the keyset query for a list request.
+
+    Returns (query, selected field names), or (None, error body) when the
+    request asks for an unknown field. Each result row is the key followed
+    by the selected fields.
+    """
+    args = req.args
+    selected = fields
+    if args.get('fields'):
+        selected = tuple(name.strip() for name in args['fields'].split(',') if name.strip())
+        unknown = [name for name in selected if name not in fields]
+        if unknown:
+            return None, {'error_code': 'LIST001', 'error_message': f'Unknown field: {unknown[0]}'}
+    
+    query = db.select(key, *(getattr(model, name) for name in selected)).order_by(key)
+    for name in filters:
+        if name in args:
+            query = query.where(getattr(model, name) == args[name])
+    after = args.get('after', type=int)
+    if after is not None:
+        query = query.where(key > after)
+    
+    if not wants_ndjson(req):
+        query = query.limit(page_size(req) + 1)
+    return query, selected
+
+def wants_ndjson(req):
+    return req.args.get('format') == 'ndjson' or req.accept_mimetypes.best == 'application/x-ndjson'
+
+def page_size(req):
+    return min(max(req.args.get('limit', DEFAULT_PAGE_SIZE, type=int), 1), MAX_PAGE_SIZE)
+
+def encode_page(serializer, rows, selected, limit):
+    page = rows[:limit]
+    next_cursor = page[-1][0] if len(rows) > limit else None
+    return serializer.encode_page(selected, page, next_cursor)
+
+def list_records(model, key, serializer, filters):
+    query, selected = list_query(model, key, serializer.fields, filters, request)
+    if query is None:
+        return selected, 400
+    
+    if wants_ndjson(request):
+        def lines():
+            rows = db.session.execute(query.execution_options(yield_per=STREAM_CHUNK_SIZE))
+            for row in rows:
+                yield serializer.encode_row(selected, row[1:]) + b'\n'
+        return Response(stream_with_context(lines()), mimetype='application/x-ndjson')
+    
+    rows = db.session.execute(query).all()
+    return json_response(encode_page(serializer, rows, selected, page_size(request)), 200)
+
+# Single-entity GETs are answered from entity_cache (see cache.py). Every
+# handler that writes a course or student deletes its key after committing.
+entity_cache = make_cache()
+
+# Rows carry no update timestamp, so there is no honest Last-Modified; the
+# ETag is a digest of the body and stays the same however often the entry
+# is evicted and reloaded.
+def cache_entry(body):
+    digest = hashlib.sha1(json.dumps(body, sort_keys=True).encode()).hexdigest()
+    return {'body': body, 'etag': digest}
+
+def validator_headers(entry):
+    return {
+        'ETag': quote_etag(entry['etag']),
+        'Cache-Control': 'no-cache'
+    }
+
+def is_not_modified(entry, req):
+    """Whether the client's If-None-Match still holds"""
+    return req.if_none_match.contains(entry['etag'])
+
+def cached_get(key, load):
+    """Serve the body returned by ``load()`` through the cache, with validators.
+
+    Returns None when ``load()`` finds nothing (misses are not cached), a 304
+    response when the client's validators still hold, and otherwise the body
+    with an ETag header.
+    """
+    entry = entity_cache.get(key)
+    if entry is None:
+        body = load()
+        if body is None:
+            return None
+        entry = cache_entry(body)
+        entity_cache.set(key, entry)
+    
+    if is_not_modified(entry, request):
+        return Response(status=304, headers=validator_headers(entry))
+    return entry['body'], 200, validator_headers(entry)
+
+# Background jobs
+#
+# Deleting a course or student cascades to its enrollments and marks, and a
+# batch can hold many thousands of items. A client that sends
+# ``Prefer: respond-async`` gets 202 with a job id instead of waiting; the
+# work runs in job_queue's process pool (see jobs.py; the handlers are in
+# tasks.py) and the job endpoints under /api/jobs report its status and
+# result. POST /api/jobs with kind ingest_marks runs ingest_marks.py against
+# Lab4's data.csv.
+
+def prefers_async():
+    """Whether the client asked for 202 Accepted instead of waiting (RFC 7240)"""
+    return 'respond-async' in request.headers.get('Prefer', '')
+
+def delete_course(course):
+    course_id = course.course_id
+    delete_dependents(db.session.connection(), 'course_id', course_id)
+    db.session.delete(course)
+    db.session.commit()
+    # Enrollment responses are not cached, so the cascade needs no more than this
+    entity_cache.delete(f'course:{course_id}')
+
+def delete_student(student):
+    student_id = student.student_id
+    delete_dependents(db.session.connection(), 'student_id', student_id)
+    db.session.delete(student)
+    db.session.commit()
+    entity_cache.delete(f'student:{student_id}')
 
 # API Resources
 class CourseAPI(Resource):
     def get(self, course_id):
-        course = Course.query.get(course_id)
-        if not course:
-            return {'error_code': 'COURSE001', 'error_message': 'Course not found'}, 404
+        def load():
+            course = Course.query.get(course_id)
+            return course and serializers.course.dump(course)
         
-        return {
-            'course_id': course.course_id,
-            'course_name': course.course_name,
-            'course_code': course.course_code,
-            'course_description': course.course_description
-        }, 200
+        response = cached_get(f'course:{course_id}', load)
+        if response is None:
+            return {'error_code': 'COURSE001', 'error_message': 'Course not found'}, 404
+        return response
     
     def put(self, course_id):
         course = Course.query.get(course_id)
@@ -71,24 +419,24 @@ class CourseAPI(Resource):
         except IntegrityError:
             db.session.rollback()
             return {'error_code': 'COURSE002', 'error_message': 'Course Code already exists'}, 409
+        entity_cache.delete(f'course:{course.course_id}')
         
-        return {
-            'course_id': course.course_id,
-            'course_name': course.course_name,
-            'course_code': course.course_code,
-            'course_description': course.course_description
-        }, 200
+        return serializers.course.dump(course), 200
     
     def delete(self, course_id):
         course = Course.query.get(course_id)
         if not course:
             return {'error_code': 'COURSE001', 'error_message': 'Course not found'}, 404
         
-        db.session.delete(course)
-        db.session.commit()
+        if prefers_async():
+            return job_queue.accept('delete_course', {'course_id': course_id})
+        delete_course(course)
         return {}, 200
 
 class CourseListAPI(Resource):
+    def get(self):
+        return list_records(Course, Course.course_id, serializers.course, filters=('course_code',))
+    
     def post(self):
         data = request.get_json()
         
@@ -110,26 +458,20 @@ class CourseListAPI(Resource):
         except IntegrityError:
             db.session.rollback()
             return {'error_code': 'COURSE002', 'error_message': 'Course Code already exists'}, 409
+        entity_cache.delete(f'course:{course.course_id}')
         
-        return {
-            'course_id': course.course_id,
-            'course_name': course.course_name,
-            'course_code': course.course_code,
-            'course_description': course.course_description
-        }, 201
+        return serializers.course.dump(course), 201
 
 class StudentAPI(Resource):
     def get(self, student_id):
-        student = Student.query.get(student_id)
-        if not student:
-            return {'error_code': 'STUDENT001', 'error_message': 'Student not found'}, 404
+        def load():
+            student = Student.query.get(student_id)
+            return student and serializers.student.dump(student)
         
-        return {
-            'student_id': student.student_id,
-            'roll_number': student.roll_number,
-            'first_name': student.first_name,
-            'last_name': student.last_name
-        }, 200
+        response = cached_get(f'student:{student_id}', load)
+        if response is None:
+            return {'error_code': 'STUDENT001', 'error_message': 'Student not found'}, 404
+        return response
     
     def put(self, student_id):
         student = Student.query.get(student_id)
@@ -156,24 +498,24 @@ class StudentAPI(Resource):
         except IntegrityError:
             db.session.rollback()
             return {'error_code': 'STUDENT001', 'error_message': 'Roll Number already exists'}, 409
+        entity_cache.delete(f'student:{student.student_id}')
         
-        return {
-            'student_id': student.student_id,
-            'roll_number': student.roll_number,
-            'first_name': student.first_name,
-            'last_name': student.last_name
-        }, 200
+        return serializers.student.dump(student), 200
     
     def delete(self, student_id):
         student = Student.query.get(student_id)
         if not student:
             return {'error_code': 'STUDENT001', 'error_message': 'Student not found'}, 404
         
-        db.session.delete(student)
-        db.session.commit()
+        if prefers_async():
+            return job_queue.accept('delete_student', {'student_id': student_id})
+        delete_student(student)
         return {}, 200
 
 class StudentListAPI(Resource):
+    def get(self):
+        return list_records(Student, Student.student_id, serializers.student, filters=('roll_number',))
+    
     def post(self):
         data = request.get_json()
         
@@ -195,32 +537,48 @@ class StudentListAPI(Resource):
         except IntegrityError:
             db.session.rollback()
             return {'error_code': 'STUDENT001', 'error_message': 'Roll Number already exists'}, 409
+        entity_cache.delete(f'student:{student.student_id}')
         
-        return {
-            'student_id': student.student_id,
-            'roll_number': student.roll_number,
-            'first_name': student.first_name,
-            'last_name': student.last_name
-        }, 201
+        return serializers.student.dump(student), 201
+
+class CourseStatsAPI(Resource):
+    def get(self, course_id):
+        row = db.session.execute(course_stats_query().where(Course.course_id == course_id)).first()
+        if row is None:
+            return {'error_code': 'COURSE001', 'error_message': 'Course not found'}, 404
+        return course_stats_body(row), 200
+
+class CourseStatsListAPI(Resource):
+    def get(self):
+        """Stats for every course, or only those in ?course_id=1,2,3"""
+        course_ids = course_id_filter(request)
+        if course_ids is None:
+            return {'error_code': 'COURSE003', 'error_message': 'course_id must be a comma-separated list of ids'}, 400
+        query = course_stats_query().order_by(Course.course_id)
+        if course_ids:
+            query = query.where(Course.course_id.in_(course_ids))
+        return {'items': [course_stats_body(row) for row in db.session.execute(query)]}, 200
+
+class CacheStatsAPI(Resource):
+    def get(self):
+        return entity_cache.stats(), 200
 
 class EnrollmentAPI(Resource):
     def get(self, student_id):
-        student = Student.query.get(student_id)
-        if not student:
+        # One round trip: the student row, left-joined to each enrollment whose
+        # course still exists. A student without enrollments yields one NULL row.
+        course_exists = db.exists().where(Course.course_id == Enrollment.course_id)
+        rows = db.session.query(Enrollment.enrollment_id, Student.student_id, Enrollment.course_id) \
+            .select_from(Student) \
+            .outerjoin(Enrollment, db.and_(Enrollment.student_id == Student.student_id, course_exists)) \
+            .filter(Student.student_id == student_id) \
+            .order_by(Enrollment.enrollment_id) \
+            .all()
+        if not rows:
             return {'error_code': 'ENROLLMENT002', 'error_message': 'Student does not exist.'}, 404
         
-        enrollments = Enrollment.query.filter_by(student_id=student_id).all()
-        courses = []
-        for enrollment in enrollments:
-            course = Course.query.get(enrollment.course_id)
-            if course:
-                courses.append({
-                    'enrollment_id': enrollment.enrollment_id,
-                    'student_id': enrollment.student_id,
-                    'course_id': enrollment.course_id
-                })
-        
-        return courses, 200
+        courses = serializers.enrollment.encode_list(row for row in rows if row[0] is not None)
+        return json_response(courses, 200)
     
     def post(self, student_id):
         student = Student.query.get(student_id)
@@ -229,61 +587,309 @@ class EnrollmentAPI(Resource):
         
         data = request.get_json()
         course_id = data.get('course_id')
+        if isinstance(course_id, bool):
+            course_id = None  # JSON true/false would otherwise be read as 1/0
         
-        course = Course.query.get(course_id)
+        course = Course.query.get(course_id) if course_id is not None else None
         if not course:
             return {'error_code': 'ENROLLMENT001', 'error_message': 'Course does not exist'}, 404
         
         existing = Enrollment.query.filter_by(student_id=student_id, course_id=course_id).first()
         if existing:
-            return {
-                'enrollment_id': existing.enrollment_id,
-                'student_id': existing.student_id,
-                'course_id': existing.course_id
-            }, 201
+            return serializers.enrollment.dump(existing), 201
         
         enrollment = Enrollment(student_id=student_id, course_id=course_id)
         db.session.add(enrollment)
-        db.session.commit()
+        try:
+            db.session.commit()
+        except IntegrityError:
+            # A concurrent request enrolled the same pair first
+            db.session.rollback()
+            enrollment = Enrollment.query.filter_by(student_id=student_id, course_id=course_id).first()
+            if enrollment is None:
+                raise
         
-        return {
-            'enrollment_id': enrollment.enrollment_id,
-            'student_id': enrollment.student_id,
-            'course_id': enrollment.course_id
-        }, 201
+        return serializers.enrollment.dump(enrollment), 201
     
     def delete(self, student_id, course_id):
-        # --- START OF FIX ---
+        student_exists = db.exists().where(Student.student_id == student_id)
+        course_exists = db.exists().where(Course.course_id == course_id)
+        
+        # Common case: one DELETE that only matches when student and course exist
+        deleted = Enrollment.query \
+            .filter_by(student_id=student_id, course_id=course_id) \
+            .filter(student_exists, course_exists) \
+            .delete(synchronize_session=False)
+        adjust_enrollment_counts(db.session.connection(), {course_id: -deleted})
+        db.session.commit()
+        if deleted:
+            return {}, 200
         
-        # 1. Check if the student exists (like in GET and POST)
-        student = Student.query.get(student_id)
-        if not student:
+        # Nothing deleted: work out which error applies in a single query
+        found_student, found_course = db.session.query(student_exists, course_exists).one()
+        if not found_student:
             return {'error_code': 'ENROLLMENT002', 'error_message': 'Student does not exist.'}, 404
-        
-        # 2. Check if the course exists (like in POST)
-        course = Course.query.get(course_id)
-        if not course:
-            # Using the same error code as your POST method
+        if not found_course:
             return {'error_code': 'ENROLLMENT001', 'error_message': 'Course does not exist'}, 404
-        
-        # --- END OF FIX ---
+        return {'error_code': 'ENROLLMENT001', 'error_message': 'Enrollment for the student not found'}, 404
 
-        # 3. Now, find the specific enrollment
-        enrollment = Enrollment.query.filter_by(student_id=student_id, course_id=course_id).first()
-        if not enrollment:
-            # This error message is now correct, as we know both student and course exist
-            return {'error_code': 'ENROLLMENT001', 'error_message': 'Enrollment for the student not found'}, 404
-        
-        db.session.delete(enrollment)
-        db.session.commit()
-        return {}, 200
+# Batch endpoints
+#
+# Each accepts a JSON array, or NDJSON (one object per line) when sent as
+# application/x-ndjson, and answers with one result per item in the same
+# format. Items are validated with the same error codes as the single-record
+# endpoints and written with one multi-row INSERT and one commit per chunk.
+BATCH_CHUNK_SIZE = 500
+
+def batch_error(index, status, error_code, error_message):
+    return {'index': index, 'status': status, 'error_code': error_code, 'error_message': error_message}
+
+def read_ndjson(stream):
+    for line in stream:
+        if line.strip():
+            try:
+                yield json.loads(line)
+            except ValueError:
+                yield None
+
+def batch_results(items, insert_chunk):
+    """Feed ``items`` to ``insert_chunk(chunk, session)`` in chunks, yielding the results"""
+    numbered = enumerate(items)
+    while True:
+        chunk = list(islice(numbered, BATCH_CHUNK_SIZE))
+        if not chunk:
+            break
+        yield from insert_chunk(chunk, db.session)
+
+def run_batch(entity):
+    """Insert the request's items with BATCH_IMPORTERS[entity] and return the results.
+
+    With ``Prefer: respond-async`` the items are queued as an import_batch
+    job and the response is 202; the job's result is the same result list.
+    """
+    streaming = request.mimetype == 'application/x-ndjson'
+    if streaming:
+        items = read_ndjson(request.stream)
+    else:
+        items = request.get_json(silent=True)
+        if not isinstance(items, list):
+            return {'error_code': 'BATCH001', 'error_message': 'Expected a JSON array'}, 400
+    
+    if prefers_async():
+        return job_queue.accept('import_batch', {'entity': entity, 'items': list(items)})
+    results = batch_results(items, BATCH_IMPORTERS[entity])
+    if streaming:
+        lines = (serializers.dumps(result) + b'\n' for result in results)
+        return Response(stream_with_context(lines), mimetype='application/x-ndjson')
+    return list(results), 200
+
+def insert_rows(session, model, key, natural_key, rows):
+    """Multi-row INSERT of ``rows``; returns {natural key value: new primary key}.
+
+    RETURNING order is not guaranteed, so new ids are matched back to their
+    rows by a unique natural key rather than by position.
+    """
+    columns = [getattr(model, name) for name in natural_key]
+    statement = db.insert(model).returning(key, *columns)
+    return {tuple(natural): new_id for new_id, *natural in session.execute(statement, rows)}
+
+def bulk_insert(session, chunk, model, key, fields, required, unique, conflict):
+    """Validate and insert one chunk of students or courses.
+
+    ``required`` lists (field, error_code, error_message) checks in the order
+    the single-record endpoint applies them; ``unique`` is the field whose
+    duplicates are reported with the ``conflict`` error.
+    """
+    results = {}
+    valid = []
+    for index, data in chunk:
+        if not isinstance(data, dict):
+            data = {}
+        for field, error_code, error_message in required:
+            if not data.get(field):
+                results[index] = batch_error(index, 400, error_code, error_message)
+                break
+        else:
+            valid.append((index, {field: data.get(field) for field in fields}))
+    
+    values = [row[unique] for _, row in valid]
+    taken = set(session.scalars(db.select(getattr(model, unique)).where(getattr(model, unique).in_(values))))
+    pending = []
+    for index, row in valid:
+        if row[unique] in taken:
+            results[index] = batch_error(index, 409, *conflict)
+        else:
+            taken.add(row[unique])
+            pending.append((index, row))
+    
+    if pending:
+        try:
+            ids = insert_rows(session, model, key, (unique,), [row for _, row in pending])
+            session.commit()
+        except IntegrityError:
+            # Lost a race with another writer: fall back to row-by-row inserts
+            session.rollback()
+            ids = {}
+            for _, row in pending:
+                try:
+                    ids.update(insert_rows(session, model, key, (unique,), [row]))
+                    session.commit()
+                except IntegrityError:
+                    session.rollback()
+        for index, row in pending:
+            new_id = ids.get((row[unique],))
+            if new_id is None:
+                results[index] = batch_error(index, 409, *conflict)
+            else:
+                results[index] = {'index': index, 'status': 201, key.key: new_id, **row}
+    
+    return [results[index] for index, _ in chunk]
+
+class StudentBatchAPI(Resource):
+    def post(self):
+        return run_batch('students')
+    
+    @staticmethod
+    def insert_chunk(chunk, session):
+        return bulk_insert(
+            session, chunk, Student, Student.student_id,
+            fields=('roll_number', 'first_name', 'last_name'),
+            required=[('roll_number', 'STUDENT001', 'Roll Number required'),
+                      ('first_name', 'STUDENT002', 'First Name is required')],
+            unique='roll_number',
+            conflict=('STUDENT001', 'Roll Number already exists'))
+
+class CourseBatchAPI(Resource):
+    def post(self):
+        return run_batch('courses')
+    
+    @staticmethod
+    def insert_chunk(chunk, session):
+        return bulk_insert(
+            session, chunk, Course, Course.course_id,
+            fields=('course_name', 'course_code', 'course_description'),
+            required=[('course_name', 'COURSE001', 'Course Name is required'),
+                      ('course_code', 'COURSE002', 'Course Code is required')],
+            unique='course_code',
+            conflict=('COURSE002', 'Course Code already exists'))
+
+def json_id(value):
+    """``value`` if it is a JSON integer, else None (true and false are ints in Python)"""
+    return value if isinstance(value, int) and not isinstance(value, bool) else None
+
+def insert_enrollments(session, pairs):
+    """Insert (student_id, course_id) ``pairs`` and count them in course_stats, uncommitted.
+
+    Returns {(student_id, course_id): enrollment_id} like insert_rows.
+    """
+    ids = insert_rows(session, Enrollment, Enrollment.enrollment_id, ('student_id', 'course_id'),
+                      [{'student_id': s, 'course_id': c} for s, c in pairs])
+    adjust_enrollment_counts(session.connection(), Counter(c for _, c in pairs))
+    return ids
+
+class EnrollmentBatchAPI(Resource):
+    def post(self):
+        return run_batch('enrollments')
+    
+    @staticmethod
+    def insert_chunk(chunk, session):
+        pairs = []
+        for index, data in chunk:
+            data = data if isinstance(data, dict) else {}
+            pairs.append((index, json_id(data.get('student_id')), json_id(data.get('course_id'))))
+        
+        student_ids = {s for _, s, _ in pairs if s is not None}
+        course_ids = {c for _, _, c in pairs if c is not None}
+        students = set(session.scalars(db.select(Student.student_id).where(Student.student_id.in_(student_ids))))
+        courses = set(session.scalars(db.select(Course.course_id).where(Course.course_id.in_(course_ids))))
+        existing = {
+            (s, c): e for e, s, c in session.execute(
+                db.select(Enrollment.enrollment_id, Enrollment.student_id, Enrollment.course_id)
+                .where(Enrollment.student_id.in_(students), Enrollment.course_id.in_(courses)))
+        }
+        
+        results = {}
+        new_pairs = []
+        for index, student_id, course_id in pairs:
+            if student_id not in students:
+                results[index] = batch_error(index, 404, 'ENROLLMENT002', 'Student does not exist.')
+            elif course_id not in courses:
+                results[index] = batch_error(index, 404, 'ENROLLMENT001', 'Course does not exist')
+            elif (student_id, course_id) not in existing:
+                existing[(student_id, course_id)] = None
+                new_pairs.append((student_id, course_id))
+        
+        if new_pairs:
+            try:
+                existing.update(insert_enrollments(session, new_pairs))
+                session.commit()
+            except IntegrityError:
+                # Lost a race with another writer: fall back to row-by-row inserts
+                session.rollback()
+                for pair in new_pairs:
+                    try:
+                        existing.update(insert_enrollments(session, [pair]))
+                        session.commit()
+                    except IntegrityError:
+                        session.rollback()
+                        existing[pair] = session.scalar(
+                            db.select(Enrollment.enrollment_id)
+                            .where(Enrollment.student_id == pair[0], Enrollment.course_id == pair[1]))
+        
+        # Already-enrolled pairs answer like a repeated POST: 201 with the existing row
+        for index, student_id, course_id in pairs:
+            if index in results:
+                continue
+            if existing[(student_id, course_id)] is None:
+                # Neither inserted nor found: the student or course was deleted meanwhile
+                if session.get(Student, student_id) is None:
+                    results[index] = batch_error(index, 404, 'ENROLLMENT002', 'Student does not exist.')
+                else:
+                    results[index] = batch_error(index, 404, 'ENROLLMENT001', 'Course does not exist')
+            else:
+                results[index] = {
+                    'index': index,
+                    'status': 201,
+                    'enrollment_id': existing[(student_id, course_id)],
+                    'student_id': student_id,
+                    'course_id': course_id
+                }
+        return [results[index] for index, _ in chunk]
 
 # Register API endpoints
+BATCH_IMPORTERS = {
+    'students': StudentBatchAPI.insert_chunk,
+    'courses': CourseBatchAPI.insert_chunk,
+    'enrollments': EnrollmentBatchAPI.insert_chunk,
+}
+
+# The handlers live in tasks.py, which imports this module
+job_queue.register('delete_course', 'tasks:delete_course_job',
+                   on_success=lambda payload, result: entity_cache.delete(f"course:{payload['course_id']}"))
+job_queue.register('delete_student', 'tasks:delete_student_job',
+                   on_success=lambda payload, result: entity_cache.delete(f"student:{payload['student_id']}"))
+job_queue.register('import_batch', 'tasks:import_batch_job')
+job_queue.register('ingest_marks', 'tasks:ingest_marks_job')
+app.register_blueprint(jobs.blueprint(job_queue), url_prefix='/api')
+
 api.add_resource(CourseAPI, '/api/course/<int:course_id>')
 api.add_resource(CourseListAPI, '/api/course')
 api.add_resource(StudentAPI, '/api/student/<int:student_id>')
 api.add_resource(StudentListAPI, '/api/student')
+api.add_resource(StudentBatchAPI, '/api/student/batch')
+api.add_resource(CourseBatchAPI, '/api/course/batch')
+api.add_resource(EnrollmentBatchAPI, '/api/enrollment/batch')
+api.add_resource(CacheStatsAPI, '/api/cache/stats')
+api.add_resource(CourseStatsAPI, '/api/course/<int:course_id>/stats')
+api.add_resource(CourseStatsListAPI, '/api/course/stats')
 api.add_resource(EnrollmentAPI, '/api/student/<int:student_id>/course', '/api/student/<int:student_id>/course/<int:course_id>')
 
+# Pool processes import this module too; the web process has done this for them
+if not jobs.in_pool_process():
+    with app.app_context():
+        ensure_indexes()
+    # Pick up jobs queued before a restart
+    job_queue.start()
+
 if __name__ == '__main__':
-    app.run(debug=True)
\ No newline at end of file
+    app.run(debug=True, port=int(os.environ.get('LAB6_PORT', 5000)))
\ No newline at end of file
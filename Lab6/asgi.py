@@ -0,0 +1,440 @@
+"""ASGI variant of the Lab6 API.
+
+Serves the same URLs, payloads and error codes as app.py, on Quart with
+async SQLAlchemy sessions over aiosqlite, except for background jobs:
+/api/jobs is not served here and ``Prefer: respond-async`` is ignored, so
+deletes and batches always complete within the request. Run app.py for
+those; both can share one database. Requests wait on the database
+without holding a thread, so one process can keep thousands of idle
+keep-alive connections open. The models, schema setup and the pure helpers
+(list queries, cache validators, batch chunk inserts) are shared with
+app.py.
+
+    uvicorn asgi:app --workers 4
+
+Needs the optional packages quart, aiosqlite and an ASGI server.
+"""
+import json
+from collections import Counter
+from itertools import islice
+
+from quart import Quart, Response, request
+from quart.views import MethodView
+from werkzeug.exceptions import HTTPException, UnsupportedMediaType
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+import app as wsgi
+import db_profile
+import serializers
+from app import (BATCH_CHUNK_SIZE, Course, Enrollment, Student, adjust_enrollment_counts,
+                 cache_entry, course_id_filter, course_stats_body, course_stats_query, db,
+                 delete_dependents, encode_page, entity_cache, is_not_modified, list_query,
+                 page_size, validator_headers, wants_ndjson)
+
+app = Quart(__name__)
+app.json.sort_keys = False
+
+with wsgi.app.app_context():
+    sync_url = db.engine.url
+if sync_url.get_backend_name() == 'sqlite':
+    async_url = sync_url.set(drivername='sqlite+aiosqlite')
+else:
+    async_url = sync_url
+engine = create_async_engine(async_url, **wsgi.app.config['SQLALCHEMY_ENGINE_OPTIONS'])
+db_profile.install_pragmas(wsgi.app, engine.sync_engine)
+Session = async_sessionmaker(engine, expire_on_commit=False)
+
+
+async def cached_get(key, load):
+    """Async counterpart of app.cached_get"""
+    entry = entity_cache.get(key)
+    if entry is None:
+        body = await load()
+        if body is None:
+            return None
+        entry = cache_entry(body)
+        entity_cache.set(key, entry)
+
+    if is_not_modified(entry, request):
+        return Response('', status=304, headers=validator_headers(entry))
+    return entry['body'], 200, validator_headers(entry)
+
+
+def json_response(body, status):
+    return Response(body, status=status, mimetype='application/json')
+
+
+@app.errorhandler(HTTPException)
+async def http_error(error):
+    """HTTP errors as {"message": ...} JSON, the way Flask-RESTful answers them in app.py"""
+    return json_response(serializers.dumps({'message': error.description}), error.code)
+
+
+async def json_body():
+    """The request's JSON; like Flask's get_json(), a body not sent as JSON is a 415"""
+    if not request.is_json:
+        raise UnsupportedMediaType("Did not attempt to load JSON data because the request "
+                                   "Content-Type was not 'application/json'.")
+    return await request.get_json()
+
+
+async def list_records(model, key, serializer, filters):
+    query, selected = list_query(model, key, serializer.fields, filters, request)
+    if query is None:
+        return selected, 400
+
+    if wants_ndjson(request):
+        async def lines():
+            async with Session() as session:
+                rows = await session.stream(query)
+                async for row in rows:
+                    yield serializer.encode_row(selected, row[1:]) + b'\n'
+        return Response(lines(), mimetype='application/x-ndjson')
+
+    async with Session() as session:
+        rows = (await session.execute(query)).all()
+    return json_response(encode_page(serializer, rows, selected, page_size(request)), 200)
+
+
+async def delete_enrollments(session, *conditions):
+    """Bulk-delete enrollments and take them off the course_stats counts"""
+    result = await session.execute(db.delete(Enrollment).where(*conditions).returning(Enrollment.course_id))
+    course_ids = result.scalars().all()
+    deltas = {course_id: -count for course_id, count in Counter(course_ids).items()}
+    await session.run_sync(lambda sync: adjust_enrollment_counts(sync.connection(), deltas))
+    return len(course_ids)
+
+
+async def run_batch(insert_chunk):
+    """Async counterpart of app.run_batch; chunks run on the sync session API"""
+    streaming = request.mimetype == 'application/x-ndjson'
+    if streaming:
+        lines = (await request.get_data(as_text=True)).splitlines()
+        items = (json_or_none(line) for line in lines if line.strip())
+    else:
+        items = await request.get_json(silent=True)
+        if not isinstance(items, list):
+            return {'error_code': 'BATCH001', 'error_message': 'Expected a JSON array'}, 400
+
+    async def results():
+        numbered = enumerate(items)
+        async with Session() as session:
+            while True:
+                chunk = list(islice(numbered, BATCH_CHUNK_SIZE))
+                if not chunk:
+                    break
+                for result in await session.run_sync(lambda sync: insert_chunk(chunk, sync)):
+                    yield result
+
+    if streaming:
+        async def body():
+            async for result in results():
+                yield serializers.dumps(result) + b'\n'
+        return Response(body(), mimetype='application/x-ndjson')
+    return [result async for result in results()], 200
+
+
+def json_or_none(line):
+    try:
+        return json.loads(line)
+    except ValueError:
+        return None
+
+
+class CourseAPI(MethodView):
+    async def get(self, course_id):
+        async def load():
+            async with Session() as session:
+                course = await session.get(Course, course_id)
+                return course and serializers.course.dump(course)
+
+        response = await cached_get(f'course:{course_id}', load)
+        if response is None:
+            return {'error_code': 'COURSE001', 'error_message': 'Course not found'}, 404
+        return response
+
+    async def put(self, course_id):
+        async with Session() as session:
+            course = await session.get(Course, course_id)
+            if not course:
+                return {'error_code': 'COURSE001', 'error_message': 'Course not found'}, 404
+
+            data = await json_body()
+
+            if 'course_name' in data:
+                if not data['course_name']:
+                    return {'error_code': 'COURSE001', 'error_message': 'Course Name is required'}, 400
+                course.course_name = data['course_name']
+
+            if 'course_code' in data:
+                if not data['course_code']:
+                    return {'error_code': 'COURSE002', 'error_message': 'Course Code is required'}, 400
+                course.course_code = data['course_code']
+
+            if 'course_description' in data:
+                course.course_description = data['course_description']
+
+            try:
+                await session.commit()
+            except IntegrityError:
+                await session.rollback()
+                return {'error_code': 'COURSE002', 'error_message': 'Course Code already exists'}, 409
+        entity_cache.delete(f'course:{course_id}')
+        return serializers.course.dump(course), 200
+
+    async def delete(self, course_id):
+        async with Session() as session:
+            course = await session.get(Course, course_id)
+            if not course:
+                return {'error_code': 'COURSE001', 'error_message': 'Course not found'}, 404
+
+            await session.run_sync(lambda sync: delete_dependents(sync.connection(), 'course_id', course_id))
+            await session.delete(course)
+            await session.commit()
+        entity_cache.delete(f'course:{course_id}')
+        return {}, 200
+
+
+class CourseListAPI(MethodView):
+    async def get(self):
+        return await list_records(Course, Course.course_id, serializers.course, filters=('course_code',))
+
+    async def post(self):
+        data = await json_body()
+
+        if not data.get('course_name'):
+            return {'error_code': 'COURSE001', 'error_message': 'Course Name is required'}, 400
+
+        if not data.get('course_code'):
+            return {'error_code': 'COURSE002', 'error_message': 'Course Code is required'}, 400
+
+        course = Course(
+            course_name=data['course_name'],
+            course_code=data['course_code'],
+            course_description=data.get('course_description')
+        )
+        async with Session() as session:
+            session.add(course)
+            try:
+                await session.commit()
+            except IntegrityError:
+                await session.rollback()
+                return {'error_code': 'COURSE002', 'error_message': 'Course Code already exists'}, 409
+        entity_cache.delete(f'course:{course.course_id}')
+        return serializers.course.dump(course), 201
+
+
+class StudentAPI(MethodView):
+    async def get(self, student_id):
+        async def load():
+            async with Session() as session:
+                student = await session.get(Student, student_id)
+                return student and serializers.student.dump(student)
+
+        response = await cached_get(f'student:{student_id}', load)
+        if response is None:
+            return {'error_code': 'STUDENT001', 'error_message': 'Student not found'}, 404
+        return response
+
+    async def put(self, student_id):
+        async with Session() as session:
+            student = await session.get(Student, student_id)
+            if not student:
+                return {'error_code': 'STUDENT001', 'error_message': 'Student not found'}, 404
+
+            data = await json_body()
+
+            if 'roll_number' in data:
+                if not data['roll_number']:
+                    return {'error_code': 'STUDENT001', 'error_message': 'Roll Number required'}, 400
+                student.roll_number = data['roll_number']
+
+            if 'first_name' in data:
+                if not data['first_name']:
+                    return {'error_code': 'STUDENT002', 'error_message': 'First Name is required'}, 400
+                student.first_name = data['first_name']
+
+            if 'last_name' in data:
+                student.last_name = data['last_name']
+
+            try:
+                await session.commit()
+            except IntegrityError:
+                await session.rollback()
+                return {'error_code': 'STUDENT001', 'error_message': 'Roll Number already exists'}, 409
+        entity_cache.delete(f'student:{student_id}')
+        return serializers.student.dump(student), 200
+
+    async def delete(self, student_id):
+        async with Session() as session:
+            student = await session.get(Student, student_id)
+            if not student:
+                return {'error_code': 'STUDENT001', 'error_message': 'Student not found'}, 404
+
+            await session.run_sync(lambda sync: delete_dependents(sync.connection(), 'student_id', student_id))
+            await session.delete(student)
+            await session.commit()
+        entity_cache.delete(f'student:{student_id}')
+        return {}, 200
+
+
+class StudentListAPI(MethodView):
+    async def get(self):
+        return await list_records(Student, Student.student_id, serializers.student, filters=('roll_number',))
+
+    async def post(self):
+        data = await json_body()
+
+        if not data.get('roll_number'):
+            return {'error_code': 'STUDENT001', 'error_message': 'Roll Number required'}, 400
+
+        if not data.get('first_name'):
+            return {'error_code': 'STUDENT002', 'error_message': 'First Name is required'}, 400
+
+        student = Student(
+            roll_number=data['roll_number'],
+            first_name=data['first_name'],
+            last_name=data.get('last_name')
+        )
+        async with Session() as session:
+            session.add(student)
+            try:
+                await session.commit()
+            except IntegrityError:
+                await session.rollback()
+                return {'error_code': 'STUDENT001', 'error_message': 'Roll Number already exists'}, 409
+        entity_cache.delete(f'student:{student.student_id}')
+        return serializers.student.dump(student), 201
+
+
+class StudentBatchAPI(MethodView):
+    async def post(self):
+        return await run_batch(wsgi.StudentBatchAPI.insert_chunk)
+
+
+class CourseBatchAPI(MethodView):
+    async def post(self):
+        return await run_batch(wsgi.CourseBatchAPI.insert_chunk)
+
+
+class EnrollmentBatchAPI(MethodView):
+    async def post(self):
+        return await run_batch(wsgi.EnrollmentBatchAPI.insert_chunk)
+
+
+class CourseStatsAPI(MethodView):
+    async def get(self, course_id):
+        async with Session() as session:
+            row = (await session.execute(course_stats_query().where(Course.course_id == course_id))).first()
+        if row is None:
+            return {'error_code': 'COURSE001', 'error_message': 'Course not found'}, 404
+        return course_stats_body(row), 200
+
+
+class CourseStatsListAPI(MethodView):
+    async def get(self):
+        course_ids = course_id_filter(request)
+        if course_ids is None:
+            return {'error_code': 'COURSE003', 'error_message': 'course_id must be a comma-separated list of ids'}, 400
+        query = course_stats_query().order_by(Course.course_id)
+        if course_ids:
+            query = query.where(Course.course_id.in_(course_ids))
+        async with Session() as session:
+            rows = (await session.execute(query)).all()
+        return {'items': [course_stats_body(row) for row in rows]}, 200
+
+
+class CacheStatsAPI(MethodView):
+    async def get(self):
+        return entity_cache.stats(), 200
+
+
+class EnrollmentAPI(MethodView):
+    async def get(self, student_id):
+        course_exists = db.exists().where(Course.course_id == Enrollment.course_id)
+        query = db.select(Enrollment.enrollment_id, Student.student_id, Enrollment.course_id) \
+            .select_from(Student) \
+            .outerjoin(Enrollment, db.and_(Enrollment.student_id == Student.student_id, course_exists)) \
+            .where(Student.student_id == student_id) \
+            .order_by(Enrollment.enrollment_id)
+        async with Session() as session:
+            rows = (await session.execute(query)).all()
+        if not rows:
+            return {'error_code': 'ENROLLMENT002', 'error_message': 'Student does not exist.'}, 404
+
+        return json_response(serializers.enrollment.encode_list(row for row in rows if row[0] is not None), 200)
+
+    async def post(self, student_id):
+        async with Session() as session:
+            student = await session.get(Student, student_id)
+            if not student:
+                return {'error_code': 'ENROLLMENT002', 'error_message': 'Student does not exist.'}, 404
+
+            data = await json_body()
+            course_id = data.get('course_id')
+            if isinstance(course_id, bool):
+                course_id = None  # JSON true/false would otherwise be read as 1/0
+
+            course = await session.get(Course, course_id) if course_id is not None else None
+            if not course:
+                return {'error_code': 'ENROLLMENT001', 'error_message': 'Course does not exist'}, 404
+
+            existing = (await session.execute(
+                db.select(Enrollment).filter_by(student_id=student_id, course_id=course_id)
+            )).scalars().first()
+            if existing:
+                return serializers.enrollment.dump(existing), 201
+
+            enrollment = Enrollment(student_id=student_id, course_id=course_id)
+            session.add(enrollment)
+            try:
+                await session.commit()
+            except IntegrityError:
+                # A concurrent request enrolled the same pair first
+                await session.rollback()
+                enrollment = (await session.execute(
+                    db.select(Enrollment).filter_by(student_id=student_id, course_id=course_id)
+                )).scalars().first()
+                if enrollment is None:
+                    raise
+        return serializers.enrollment.dump(enrollment), 201
+
+    async def delete(self, student_id, course_id):
+        student_exists = db.exists().where(Student.student_id == student_id)
+        course_exists = db.exists().where(Course.course_id == course_id)
+
+        async with Session() as session:
+            deleted = await delete_enrollments(
+                session, Enrollment.student_id == student_id, Enrollment.course_id == course_id,
+                student_exists, course_exists)
+            await session.commit()
+            if deleted:
+                return {}, 200
+
+            found_student, found_course = (await session.execute(
+                db.select(student_exists, course_exists))).one()
+        if not found_student:
+            return {'error_code': 'ENROLLMENT002', 'error_message': 'Student does not exist.'}, 404
+        if not found_course:
+            return {'error_code': 'ENROLLMENT001', 'error_message': 'Course does not exist'}, 404
+        return {'error_code': 'ENROLLMENT001', 'error_message': 'Enrollment for the student not found'}, 404
+
+
+# Same URL map as app.py, minus the /api/jobs blueprint (see the module docstring)
+app.add_url_rule('/api/course/<int:course_id>', view_func=CourseAPI.as_view('courseapi'))
+app.add_url_rule('/api/course', view_func=CourseListAPI.as_view('courselistapi'))
+app.add_url_rule('/api/student/<int:student_id>', view_func=StudentAPI.as_view('studentapi'))
+app.add_url_rule('/api/student', view_func=StudentListAPI.as_view('studentlistapi'))
+app.add_url_rule('/api/student/batch', view_func=StudentBatchAPI.as_view('studentbatchapi'))
+app.add_url_rule('/api/course/batch', view_func=CourseBatchAPI.as_view('coursebatchapi'))
+app.add_url_rule('/api/enrollment/batch', view_func=EnrollmentBatchAPI.as_view('enrollmentbatchapi'))
+app.add_url_rule('/api/cache/stats', view_func=CacheStatsAPI.as_view('cachestatsapi'))
+app.add_url_rule('/api/course/<int:course_id>/stats', view_func=CourseStatsAPI.as_view('coursestatsapi'))
+app.add_url_rule('/api/course/stats', view_func=CourseStatsListAPI.as_view('coursestatslistapi'))
+enrollment_view = EnrollmentAPI.as_view('enrollmentapi')
+app.add_url_rule('/api/student/<int:student_id>/course', view_func=enrollment_view)
+app.add_url_rule('/api/student/<int:student_id>/course/<int:course_id>', view_func=enrollment_view)
+
+if __name__ == '__main__':
+    app.run()
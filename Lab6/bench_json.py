@@ -0,0 +1,73 @@
+"""Cost of encoding Lab6 responses before and after serializers.py.
+
+Compares, for one student body and a 1000-row list page:
+
+- dict-indent: a hand-built dict per record, json.dumps with indent=4
+  (what Flask-RESTful emits in debug mode, which app.py runs with)
+- dict: a hand-built dict per record, json.dumps with default separators
+- compact-json: serializers.py from row tuples, stdlib encoder
+- compact-orjson: serializers.py from row tuples, orjson (its default when
+  installed)
+
+Usage: python bench_json.py [--rows 1000] [--repeat 200]
+"""
+import argparse
+import json
+import timeit
+
+import serializers
+
+
+def sample_rows(n):
+    return [(i, f'R{i:06d}', f'First {i}', f'Last {i}') for i in range(1, n + 1)]
+
+
+def dict_page(rows):
+    return {
+        'items': [{
+            'student_id': student_id,
+            'roll_number': roll_number,
+            'first_name': first_name,
+            'last_name': last_name
+        } for student_id, roll_number, first_name, last_name in rows],
+        'next_cursor': rows[-1][0]
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', type=int, default=1000)
+    parser.add_argument('--repeat', type=int, default=200)
+    args = parser.parse_args()
+
+    rows = sample_rows(args.rows)
+    page_rows = [(row[0],) + row for row in rows]
+    one = rows[0]
+
+    def using(use_orjson, encode):
+        def run():
+            serializers.USE_ORJSON = use_orjson
+            return encode()
+        return run
+
+    encode_one = lambda: serializers.student.encode_row(serializers.student.fields, one)
+    encode_page = lambda: serializers.student.encode_page(serializers.student.fields, page_rows, rows[-1][0])
+    encoders = {
+        'dict-indent': (lambda: json.dumps(dict(zip(serializers.student.fields, one)), indent=4),
+                        lambda: json.dumps(dict_page(rows), indent=4)),
+        'dict': (lambda: json.dumps(dict(zip(serializers.student.fields, one))),
+                 lambda: json.dumps(dict_page(rows))),
+        'compact-json': (using(False, encode_one), using(False, encode_page)),
+    }
+    if serializers.orjson is not None:
+        encoders['compact-orjson'] = (using(True, encode_one), using(True, encode_page))
+
+    print(f'{"encoder":<14} {"entity B":>9} {"entity us":>10} {"page B":>9} {"page us":>10}')
+    for name, (entity, page) in encoders.items():
+        entity_us = min(timeit.repeat(entity, number=args.repeat * 10, repeat=3)) / (args.repeat * 10) * 1e6
+        page_us = min(timeit.repeat(page, number=args.repeat, repeat=3)) / args.repeat * 1e6
+        print(f'{name:<14} {len(entity()):>9} {entity_us:>10.1f} {len(page()):>9} {page_us:>10.1f}')
+
+
+if __name__ == '__main__':
+    main()
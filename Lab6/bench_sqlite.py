@@ -0,0 +1,88 @@
+"""Concurrent read/write throughput of the Lab6 API with and without SQLite tuning.
+
+Each mode runs in a fresh process against its own scratch database: reader
+threads GET random students while writer threads POST new ones, all through
+the Flask test client. The entity cache is disabled so every read reaches
+SQLite.
+
+Usage: python bench_sqlite.py [--seconds 5] [--readers 8] [--writers 2] [--rows 2000]
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+CHILD = '''
+import json, random, sys, threading, time
+from app import Student, app, db
+
+seconds, readers, writers, rows = {seconds}, {readers}, {writers}, {rows}
+with app.app_context():
+    db.session.add_all(Student(roll_number=f'seed{{i}}', first_name='S') for i in range(rows))
+    db.session.commit()
+
+counts = {{'reads': 0, 'writes': 0, 'errors': 0}}
+lock = threading.Lock()
+deadline = time.perf_counter() + seconds
+
+def worker(kind, n):
+    client = app.test_client()
+    done = errors = 0
+    while time.perf_counter() < deadline:
+        if kind == 'reads':
+            response = client.get(f'/api/student/{{random.randint(1, rows)}}')
+        else:
+            response = client.post('/api/student', json={{'roll_number': f'w{{n}}-{{done}}', 'first_name': 'W'}})
+        if response.status_code >= 400:
+            errors += 1
+        done += 1
+    with lock:
+        counts[kind] += done
+        counts['errors'] += errors
+
+threads = [threading.Thread(target=worker, args=('reads', i)) for i in range(readers)]
+threads += [threading.Thread(target=worker, args=('writes', i)) for i in range(writers)]
+for t in threads:
+    t.start()
+for t in threads:
+    t.join()
+print(json.dumps(counts))
+'''
+
+
+def run(tuned, args):
+    scratch = tempfile.mkdtemp()
+    env = dict(os.environ,
+               LAB6_DATABASE_URI='sqlite:///' + os.path.join(scratch, 'bench.sqlite3'),
+               LAB6_SQLITE_TUNING='1' if tuned else '0',
+               LAB6_CACHE_TTL='0')
+    env.pop('LAB6_CACHE_URL', None)
+    code = CHILD.format(seconds=args.seconds, readers=args.readers,
+                        writers=args.writers, rows=args.rows)
+    out = subprocess.run([sys.executable, '-c', code], cwd=HERE, env=env,
+                         check=True, capture_output=True, text=True)
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--seconds', type=float, default=5)
+    parser.add_argument('--readers', type=int, default=8)
+    parser.add_argument('--writers', type=int, default=2)
+    parser.add_argument('--rows', type=int, default=2000)
+    args = parser.parse_args()
+
+    print(f'{"profile":<10} {"reads/s":>10} {"writes/s":>10} {"errors":>8}')
+    for tuned in (False, True):
+        counts = run(tuned, args)
+        print(f'{"tuned" if tuned else "default":<10} '
+              f'{counts["reads"] / args.seconds:>10.0f} '
+              f'{counts["writes"] / args.seconds:>10.0f} {counts["errors"]:>8}')
+
+
+if __name__ == '__main__':
+    main()
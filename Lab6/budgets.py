@@ -0,0 +1,37 @@
+"""Query-count budgets for the Lab6 API, checked by ``python query_budget.py``."""
+DATABASE_ENV = 'LAB6_DATABASE_URI'
+
+# (method, url, form data, expected status, max statements)
+BUDGETS = [
+    ('GET', '/api/student/1/course', None, 200, 1),
+    ('GET', '/api/student/3/course', None, 200, 1),
+    ('GET', '/api/student/99/course', None, 404, 1),
+    ('DELETE', '/api/student/1/course/2', None, 200, 2),  # the DELETE plus its course_stats update
+    ('DELETE', '/api/student/1/course/3', None, 404, 2),
+    ('DELETE', '/api/student/99/course/1', None, 404, 2),
+    ('GET', '/api/course/1/stats', None, 200, 1),
+    ('GET', '/api/course/99/stats', None, 404, 1),
+    ('GET', '/api/course/stats', None, 200, 1),
+    # Whatever the row counts: the lookup, a bulk DELETE and course_stats update per
+    # child table, then the row itself (and a course's course_stats row)
+    ('DELETE', '/api/student/2', None, 200, 5),
+    ('DELETE', '/api/course/1', None, 200, 6),
+]
+
+
+def seed(db):
+    from app import Course, Enrollment, Student
+    db.session.add_all([
+        Student(student_id=1, roll_number='R1', first_name='A'),
+        Student(student_id=2, roll_number='R2', first_name='B'),
+        Student(student_id=3, roll_number='R3', first_name='C'),
+        Course(course_id=1, course_name='MAD I', course_code='CSE01'),
+        Course(course_id=2, course_name='DBMS', course_code='CSE02'),
+        Course(course_id=3, course_name='PDSA', course_code='CSE03'),
+    ])
+    db.session.add_all([Enrollment(student_id=s, course_id=c) for s, c in [(1, 1), (1, 2), (2, 1)]])
+    db.session.commit()
+
+
+def warm_up(client):
+    """Nothing to load: the API keeps no per-worker caches the budgets depend on"""
@@ -0,0 +1,95 @@
+"""Read-through cache for single-entity GETs.
+
+Backends share a small interface: ``get(key)`` returns the cached value or
+None, ``set(key, value)`` stores it for the configured TTL and
+``delete(key)`` drops it. ``LRUCache`` lives in the worker process;
+``RedisCache`` is shared between workers and needs the optional ``redis``
+package. ``make_cache`` picks one from the environment.
+"""
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+
+
+class LRUCache:
+    """In-process LRU with a per-entry time to live"""
+
+    def __init__(self, max_entries=10000, ttl=60):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._items = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            item = self._items.get(key)
+            if item is None or item[0] < time.monotonic():
+                if item is not None:
+                    del self._items[key]
+                self.misses += 1
+                return None
+            self._items.move_to_end(key)
+            self.hits += 1
+            return item[1]
+
+    def set(self, key, value):
+        with self._lock:
+            self._items[key] = (time.monotonic() + self.ttl, value)
+            self._items.move_to_end(key)
+            while len(self._items) > self.max_entries:
+                self._items.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._items.pop(key, None)
+
+    def stats(self):
+        return {'backend': 'memory', 'hits': self.hits, 'misses': self.misses,
+                'size': len(self._items)}
+
+
+class RedisCache:
+    """Cache shared by all workers, stored in Redis as JSON.
+
+    Any client with redis-py's ``get``/``setex``/``delete`` methods works, so
+    a local stand-in can replace a real server in development.
+    """
+
+    def __init__(self, client, ttl=60, prefix='lab6:'):
+        self.client = client
+        self.ttl = ttl
+        self.prefix = prefix
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        raw = self.client.get(self.prefix + key)
+        if raw is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return json.loads(raw)
+
+    def set(self, key, value):
+        self.client.setex(self.prefix + key, self.ttl, json.dumps(value))
+
+    def delete(self, key):
+        self.client.delete(self.prefix + key)
+
+    def stats(self):
+        # Counters are per worker; the entries themselves are shared
+        return {'backend': 'redis', 'hits': self.hits, 'misses': self.misses}
+
+
+def make_cache():
+    """Build the cache configured by LAB6_CACHE_URL / _TTL / _SIZE"""
+    ttl = int(os.environ.get('LAB6_CACHE_TTL', 60))
+    url = os.environ.get('LAB6_CACHE_URL')
+    if url:
+        import redis
+        return RedisCache(redis.Redis.from_url(url), ttl=ttl)
+    return LRUCache(max_entries=int(os.environ.get('LAB6_CACHE_SIZE', 10000)), ttl=ttl)
@@ -0,0 +1,81 @@
+"""Run an ingest_marks job through a real ``python app.py`` server.
+
+Pool processes import job handlers afresh, and under ``python app.py`` the
+app module is ``__main__`` rather than ``app``, so a handler that works with
+the test client or under gunicorn can still fail there. This starts the
+development server on scratch databases, submits an ingest_marks job over
+HTTP and exits non-zero unless it succeeds:
+
+    python check_jobs.py
+"""
+import json
+import os
+import signal
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from urllib.error import URLError
+from urllib.request import Request, urlopen
+
+TIMEOUT = 120
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def call(url, body=None):
+    data = json.dumps(body).encode() if body is not None else None
+    request = Request(url, data=data, headers={'Content-Type': 'application/json'})
+    with urlopen(request, timeout=10) as response:
+        return response.status, json.loads(response.read())
+
+
+def run_job(base):
+    deadline = time.monotonic() + TIMEOUT
+    while True:
+        try:
+            status, job = call(f'{base}/api/jobs', {'kind': 'ingest_marks'})
+            break
+        except (ConnectionError, URLError):
+            if time.monotonic() > deadline:
+                raise
+            time.sleep(0.2)  # server still starting
+    assert status == 202, f'POST /api/jobs returned {status}'
+    while job['status'] not in ('succeeded', 'failed') and time.monotonic() < deadline:
+        time.sleep(0.2)
+        _, job = call(base + job['status_url'])
+    return job
+
+
+def main():
+    scratch = tempfile.mkdtemp()
+    port = free_port()
+    env = dict(os.environ,
+               LAB6_DATABASE_URI='sqlite:///' + os.path.join(scratch, 'check.sqlite3'),
+               LAB6_JOBS_DB=os.path.join(scratch, 'jobs.sqlite3'),
+               LAB6_PORT=str(port))
+    with open(os.path.join(scratch, 'server.log'), 'w+') as log:
+        # A session of its own, so the reloader and its server process stop together
+        server = subprocess.Popen([sys.executable, 'app.py'], cwd=os.path.dirname(os.path.abspath(__file__)),
+                                  env=env, stdout=log, stderr=subprocess.STDOUT, start_new_session=True)
+        try:
+            job = run_job(f'http://127.0.0.1:{port}')
+        finally:
+            os.killpg(server.pid, signal.SIGTERM)
+            server.wait()
+        if job['status'] != 'succeeded':
+            log.seek(0)
+            print(log.read())
+            print(f"FAIL ingest_marks job {job['status']} after {job['attempts']} attempts: {job['error']}")
+            return 1
+    print("ok   ingest_marks job succeeded under python app.py")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,171 @@
+"""Stream Lab4's marks CSV into the ``marks`` table.
+
+    python ingest_marks.py [../Lab4/data.csv]
+
+The file is read one line at a time from the byte offset stored in
+``ingest_watermark`` and written in transactions of INGEST_CHUNK_SIZE rows.
+Each transaction also moves the watermark, so an interrupted run resumes
+after the last committed chunk and a rerun only reads rows appended since.
+A final line without a trailing newline may still be being written, so it
+is only ingested on a run from the start of the file, or once the file has
+not grown since the previous run; until then it is left for the next run.
+
+The watermark keeps a checksum of the WATERMARK_WINDOW bytes before the
+offset. If the file shrank or those bytes changed, it was rewritten rather
+than appended to, so its marks are cleared and it is ingested from the start.
+
+CSV student and course ids are normalized as Lab4 normalizes them (see
+normalize_id) and matched to Student.roll_number and Course.course_code.
+Ids the database does not know get placeholder rows, which can be renamed
+through the API. Every row becomes a mark, so a (student, course) pair
+listed twice has two marks, as Lab4 shows it from the CSV. The course_stats
+marks aggregates of the courses in each chunk are refreshed in the same
+transaction.
+"""
+import csv
+import hashlib
+import os
+import re
+import sys
+
+from app import (Course, IngestWatermark, Mark, Student, app, db, ensure_course_stats, insert_rows,
+                 refresh_mark_stats)
+
+DEFAULT_CSV = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'Lab4', 'data.csv')
+INGEST_CHUNK_SIZE = 5000
+WATERMARK_WINDOW = 4096
+COLUMNS = ('Student id', 'Course id', 'Marks')
+INTEGER = re.compile(r'-?[0-9]+')
+
+
+def window_checksum(f, offset):
+    f.seek(max(0, offset - WATERMARK_WINDOW))
+    return hashlib.sha1(f.read(min(offset, WATERMARK_WINDOW))).hexdigest()
+
+
+def read_header(f):
+    """Positions of the three marks columns, and the offset after the header"""
+    f.seek(0)
+    line = f.readline()
+    if not line.endswith(b'\n'):
+        return None, 0
+    names = [name.strip() for name in next(csv.reader([line.decode()]))]
+    return [names.index(column) for column in COLUMNS], len(line)
+
+
+def normalize_id(value):
+    """Canonical text of a stripped CSV id, the same as Lab4's snapshot.normalize_id gives"""
+    return str(int(value)) if INTEGER.fullmatch(value) else value
+
+
+def read_rows(f, offset, positions, final_line_ends=None):
+    """Yield (end offset, student, course, marks, valid) for complete lines from ``offset``
+
+    A last line without a newline counts as complete only when it ends at
+    ``final_line_ends``.
+    """
+    f.seek(offset)
+    width = max(positions) + 1
+    for line in f:
+        if not line.endswith(b'\n') and offset + len(line) != final_line_ends:
+            return
+        offset += len(line)
+        record = next(csv.reader([line.decode()]), [])
+        if len(record) < width:
+            yield offset, None, None, None, False
+            continue
+        student, course, marks = (record[i].strip() for i in positions)
+        valid = bool(student and course) and INTEGER.fullmatch(marks) is not None
+        if valid:
+            yield offset, normalize_id(student), normalize_id(course), int(marks), True
+        else:
+            yield offset, student, course, None, False
+
+
+def resolve_ids(session, model, key, natural_key, values, placeholder):
+    """{natural key value: primary key}, inserting placeholder rows for unknown values"""
+    column = getattr(model, natural_key)
+    ids = dict(session.execute(db.select(column, key).where(column.in_(values))).all())
+    missing = [value for value in values if value not in ids]
+    if missing:
+        created = insert_rows(session, model, key, (natural_key,),
+                              [placeholder(value) for value in missing])
+        ids.update((natural, new_id) for (natural,), new_id in created.items())
+    return ids
+
+
+def write_chunk(session, rows, watermark):
+    """Insert one chunk of (roll number, course code, marks) rows and move the watermark"""
+    if rows:
+        students = resolve_ids(session, Student, Student.student_id, 'roll_number',
+                               sorted({row[0] for row in rows}),
+                               lambda roll: {'roll_number': roll, 'first_name': f'Student {roll}'})
+        courses = resolve_ids(session, Course, Course.course_id, 'course_code',
+                              sorted({row[1] for row in rows}),
+                              lambda code: {'course_code': code, 'course_name': f'Course {code}'})
+
+        session.execute(db.insert(Mark), [{'student_id': students[student], 'course_id': courses[course],
+                                     'marks': marks} for student, course, marks in rows])
+        touched = sorted({courses[course] for _, course, _ in rows})
+        ensure_course_stats(session.connection(), touched)
+        refresh_mark_stats(session.connection(), touched)
+    session.merge(watermark)
+    session.commit()
+
+
+def ingest(path, chunk_size=INGEST_CHUNK_SIZE):
+    """Bring the marks table up to date with ``path``; call inside an app context"""
+    source = os.path.realpath(path)
+    session = db.session
+    stats = {'rows': 0, 'skipped': 0, 'restarted': False}
+
+    with open(path, 'rb') as f, open(path, 'rb') as checksums:
+        positions, header_end = read_header(f)
+        if positions is None:
+            return dict(stats, offset=0)
+
+        size = os.fstat(f.fileno()).st_size
+        watermark = session.get(IngestWatermark, source)
+        if watermark is not None and (watermark.offset > size or
+                                      window_checksum(checksums, watermark.offset) != watermark.checksum):
+            session.execute(db.delete(Mark))
+            refresh_mark_stats(session.connection())
+            session.delete(watermark)
+            session.commit()
+            watermark = None
+            stats['restarted'] = True
+        committed = watermark.offset if watermark is not None else None
+        offset = end = committed if committed is not None else header_end
+        # An unterminated last line is finished unless the file is still growing
+        settled = watermark is None or watermark.size == size
+
+        def flush(chunk, end):
+            write_chunk(session, chunk, IngestWatermark(source=source, offset=end, size=size,
+                                                        checksum=window_checksum(checksums, end)))
+            stats['rows'] += len(chunk)
+            return end
+
+        chunk = []
+        for end, student, course, marks, valid in read_rows(f, offset, positions, size if settled else None):
+            if not valid:
+                stats['skipped'] += 1
+                continue
+            chunk.append((student, course, marks))
+            if len(chunk) >= chunk_size:
+                committed = flush(chunk, end)
+                chunk = []
+        if end != committed or watermark is None or watermark.size != size:
+            flush(chunk, end)
+    return dict(stats, offset=end)
+
+
+def main():
+    path = sys.argv[1] if len(sys.argv) > 1 else DEFAULT_CSV
+    with app.app_context():
+        stats = ingest(path)
+    print(f"ingested {stats['rows']} rows, skipped {stats['skipped']}, offset {stats['offset']}"
+          + (' (file was rewritten; re-ingested from the start)' if stats['restarted'] else ''))
+
+
+if __name__ == '__main__':
+    main()
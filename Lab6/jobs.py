@@ -0,0 +1,409 @@
+"""Durable background jobs for work too slow to finish inside a request.
+
+A job is a row in a SQLite table and runs in a process pool, so the web
+worker answers 202 Accepted with a job id straight away and CPU-bound work
+(plot rendering, bulk imports) never holds the web process's GIL. Lab4 runs
+histogram rendering here; Lab6 runs cascading deletes, batch imports and
+marks ingestion.
+
+    queue = jobs.JobQueue.from_env(app, 'LAB6')
+    queue.register('delete_student', 'tasks:delete_student_job')
+    app.register_blueprint(jobs.blueprint(queue), url_prefix='/api')
+    ...
+    return queue.accept('delete_student', {'student_id': student_id})
+
+The blueprint serves POST /jobs (submit ``{"kind", "payload"}``),
+GET /jobs/<id> (status) and GET /jobs/<id>/result. Settings
+(``<PREFIX>`` is LAB4 or LAB6):
+
+    <PREFIX>_JOBS_DB            job table file (default jobs.sqlite3 next to the app)
+    <PREFIX>_JOBS_WORKERS       pool processes, i.e. jobs running at once (default 2)
+    <PREFIX>_JOBS_MAX_ATTEMPTS  tries before a job is marked failed (default 3)
+    <PREFIX>_JOBS_MAX_QUEUED    pending jobs before submissions get 503 (default 1000)
+
+Each web process runs a dispatcher thread that claims ready rows and hands
+them to its pool. A claim is a lease the dispatcher keeps renewing while the
+job runs, so jobs whose process died are claimed again once the lease runs
+out, and several web processes can share one table. A failed attempt is
+retried after an exponential backoff. The time each handler ran is
+recorded in the web process's metrics as span ``job:<kind>``.
+
+Handlers are module-level functions (they are pickled into spawned pool
+processes, which import the handler's module afresh) called with the JSON
+payload as keyword arguments. They return a JSON-serializable value, or
+bytes when registered with a mimetype. A handler whose module imports the
+app is registered as a ``'module:function'`` string instead, which only the
+pool processes import: under ``python app.py`` the web process knows the
+app module as ``__main__``, and importing it again as ``app`` would build a
+second app. Pool processes also import the main module, so module-level
+startup work belongs behind ``if not jobs.in_pool_process()``. Pool
+processes are told apart by name, which spawn sets before that import;
+other spawned processes such as uvicorn workers count as web processes.
+
+Lab4 and Lab6 each ship a copy of this module; check_shared.py at the
+repository root fails when the copies differ.
+"""
+import importlib
+import json
+import multiprocessing
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from contextlib import contextmanager
+
+from flask import Blueprint, request, url_for
+
+import metrics
+import settings
+
+QUEUED, RUNNING, SUCCEEDED, FAILED = 'queued', 'running', 'succeeded', 'failed'
+
+LEASE_SECONDS = 60
+POLL_SECONDS = 1.0
+RETRY_BACKOFF = 2.0
+RETENTION_SECONDS = 24 * 60 * 60
+POOL_PROCESS_PREFIX = 'jobs-pool-'
+
+SCHEMA = '''
+    CREATE TABLE IF NOT EXISTS jobs (
+        id TEXT PRIMARY KEY,
+        kind TEXT NOT NULL,
+        key TEXT,
+        payload TEXT NOT NULL,
+        status TEXT NOT NULL,
+        attempts INTEGER NOT NULL DEFAULT 0,
+        max_attempts INTEGER NOT NULL,
+        run_after REAL NOT NULL,
+        lease_until REAL,
+        result BLOB,
+        result_type TEXT,
+        error TEXT,
+        created_at REAL NOT NULL,
+        updated_at REAL NOT NULL
+    );
+    CREATE INDEX IF NOT EXISTS ix_jobs_status ON jobs (status, run_after);
+    CREATE INDEX IF NOT EXISTS ix_jobs_key ON jobs (key);
+'''
+
+
+class PoolProcess(multiprocessing.get_context('spawn').Process):
+    """Spawned pool process, named so in_pool_process() recognises it"""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.name = POOL_PROCESS_PREFIX + self.name
+
+
+class PoolContext(type(multiprocessing.get_context('spawn'))):
+    Process = PoolProcess
+
+
+class QueueFull(Exception):
+    """Raised by submit() when max_queued jobs are already pending"""
+
+
+class JobQueue:
+    def __init__(self, path, workers=2, max_attempts=3, max_queued=1000):
+        self.path = path
+        self.workers = workers
+        self.max_attempts = max_attempts
+        self.max_queued = max_queued
+        self.handlers = {}
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._running = {}
+        self._pool = None
+        self._thread = None
+        self._connection().executescript(SCHEMA)
+
+    @classmethod
+    def from_env(cls, app, env_prefix):
+        env = settings.reader(env_prefix)
+        return cls(env('JOBS_DB', os.path.join(app.root_path, 'jobs.sqlite3')),
+                   workers=int(env('JOBS_WORKERS', 2)),
+                   max_attempts=int(env('JOBS_MAX_ATTEMPTS', 3)),
+                   max_queued=int(env('JOBS_MAX_QUEUED', 1000)))
+
+    def _connection(self):
+        connection = getattr(self._local, 'connection', None)
+        if connection is None:
+            # Autocommit; writes take the lock up front with BEGIN IMMEDIATE
+            connection = sqlite3.connect(self.path, timeout=10, isolation_level=None)
+            connection.row_factory = sqlite3.Row
+            connection.execute('PRAGMA journal_mode=WAL')
+            self._local.connection = connection
+        return connection
+
+    @contextmanager
+    def _transaction(self):
+        connection = self._connection()
+        connection.execute('BEGIN IMMEDIATE')
+        try:
+            yield connection
+        except BaseException:
+            connection.execute('ROLLBACK')
+            raise
+        connection.execute('COMMIT')
+
+    def register(self, kind, function, mimetype=None, on_success=None):
+        """Run ``function(**payload)`` for jobs of ``kind``; see call() for string functions.
+
+        ``on_success(payload, result)`` runs in the web process that
+        dispatched the job, e.g. to drop entries from an in-process cache.
+        """
+        self.handlers[kind] = (function, mimetype, on_success)
+
+    def submit(self, kind, payload=None, key=None):
+        """Queue a job and return its id.
+
+        A job submitted with a ``key`` is shared: while a job with the same
+        key is pending or has succeeded, its id is returned instead.
+        """
+        if kind not in self.handlers:
+            raise KeyError(kind)
+        if key is not None:
+            # Most keyed submissions find their job; check before taking the write lock
+            job_id = self._find(key)
+            if job_id is not None:
+                return job_id
+        now = time.time()
+        with self._transaction() as connection:
+            if key is not None:
+                job_id = self._find(key)
+                if job_id is not None:
+                    return job_id
+            pending, = connection.execute("SELECT COUNT(*) FROM jobs WHERE status IN ('queued', 'running')"
+                                          ).fetchone()
+            if pending >= self.max_queued:
+                raise QueueFull(f'{pending} jobs pending')
+            job_id = uuid.uuid4().hex
+            connection.execute('INSERT INTO jobs (id, kind, key, payload, status, max_attempts, run_after, '
+                               'created_at, updated_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)',
+                               (job_id, kind, key, json.dumps(payload or {}), QUEUED, self.max_attempts,
+                                now, now, now))
+        self.start()
+        self._wake.set()
+        return job_id
+
+    def _find(self, key):
+        row = self._connection().execute('SELECT id FROM jobs WHERE key = ? AND status != ?',
+                                         (key, FAILED)).fetchone()
+        return row['id'] if row is not None else None
+
+    def get(self, job_id):
+        """The job's row as a dict, or None"""
+        row = self._connection().execute('SELECT * FROM jobs WHERE id = ?', (job_id,)).fetchone()
+        return dict(row) if row is not None else None
+
+    def wait(self, job_id, timeout):
+        """Poll until the job has succeeded or failed, or ``timeout`` seconds pass; returns the row"""
+        deadline = time.monotonic() + timeout
+        delay = 0.01
+        while True:
+            job = self.get(job_id)
+            if job is None or job['status'] in (SUCCEEDED, FAILED) or time.monotonic() >= deadline:
+                return job
+            time.sleep(min(delay, max(0, deadline - time.monotonic())))
+            delay = min(delay * 2, 0.2)
+
+    @staticmethod
+    def result(job):
+        """Decoded result of a succeeded job: the JSON value, or the bytes"""
+        if job['result_type'] == 'application/json':
+            return json.loads(job['result'])
+        return job['result']
+
+    def accept(self, kind, payload=None, key=None):
+        """202 response for a newly submitted job, or 503 when the queue is full"""
+        try:
+            job_id = self.submit(kind, payload, key)
+        except QueueFull:
+            return {'error_code': 'JOB004', 'error_message': 'Job queue is full, retry later'}, 503, \
+                {'Retry-After': '5'}
+        return accepted(self.get(job_id))
+
+    # Dispatcher
+
+    def start(self):
+        """Start dispatching in this process; a no-op inside pool processes"""
+        if in_pool_process():
+            return
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._dispatch, name='jobs-dispatcher', daemon=True)
+                self._thread.start()
+
+    def _dispatch(self):
+        purged = 0.0
+        while True:
+            self._wake.wait(POLL_SECONDS)
+            self._wake.clear()
+            try:
+                self._renew_leases()
+                while len(self._running) < self.workers:
+                    job = self._claim()
+                    if job is None:
+                        break
+                    self._run(job)
+                if time.time() - purged > 60 * 60:
+                    self._purge()
+                    purged = time.time()
+            except sqlite3.OperationalError:
+                pass  # table busy or locked; try again on the next round
+
+    def _claim(self):
+        """Mark the next ready job as running and return it, or None"""
+        while True:
+            now = time.time()
+            with self._transaction() as connection:
+                row = connection.execute(
+                    'SELECT id, kind, payload, attempts, max_attempts FROM jobs '
+                    'WHERE (status = ? AND run_after <= ?) OR (status = ? AND lease_until < ?) '
+                    'ORDER BY run_after LIMIT 1', (QUEUED, now, RUNNING, now)).fetchone()
+                if row is None:
+                    return None
+                if row['kind'] not in self.handlers or row['attempts'] >= row['max_attempts']:
+                    # Unknown to this version of the app, or its last attempt died with its process
+                    error = 'unknown job kind' if row['kind'] not in self.handlers else 'worker process exited'
+                    connection.execute('UPDATE jobs SET status = ?, error = ?, lease_until = NULL, updated_at = ? '
+                                       'WHERE id = ?', (FAILED, error, now, row['id']))
+                    continue
+                connection.execute('UPDATE jobs SET status = ?, attempts = attempts + 1, lease_until = ?, '
+                                   'updated_at = ? WHERE id = ?', (RUNNING, now + LEASE_SECONDS, now, row['id']))
+            return dict(row, attempts=row['attempts'] + 1)
+
+    def _run(self, job):
+        function = self.handlers[job['kind']][0]
+        payload = json.loads(job['payload'])
+        with self._lock:
+            if self._pool is None:
+                self._pool = ProcessPoolExecutor(self.workers, mp_context=PoolContext())
+            try:
+                future = self._pool.submit(call, function, payload)
+            except BrokenProcessPool:
+                # A pool process died; the rest of the pool is unusable
+                self._pool = ProcessPoolExecutor(self.workers, mp_context=PoolContext())
+                future = self._pool.submit(call, function, payload)
+            self._running[job['id']] = future
+        future.add_done_callback(lambda future: self._finished(job, payload, future))
+
+    def _finished(self, job, payload, future):
+        _, mimetype, on_success = self.handlers[job['kind']]
+        try:
+            result, seconds = future.result()
+            metrics.SPAN_SECONDS.observe(seconds, f"job:{job['kind']}")
+            data = result if mimetype else json.dumps(result).encode()
+        except Exception as error:
+            self._failed(job, error)
+        else:
+            now = time.time()
+            with self._transaction() as connection:
+                connection.execute('UPDATE jobs SET status = ?, result = ?, result_type = ?, error = NULL, '
+                                   'lease_until = NULL, updated_at = ? WHERE id = ?',
+                                   (SUCCEEDED, data, mimetype or 'application/json', now, job['id']))
+            if on_success is not None:
+                on_success(payload, result)
+        finally:
+            with self._lock:
+                del self._running[job['id']]
+            self._wake.set()
+
+    def _failed(self, job, error):
+        now = time.time()
+        message = f'{type(error).__name__}: {error}'
+        with self._transaction() as connection:
+            if job['attempts'] < job['max_attempts']:
+                connection.execute('UPDATE jobs SET status = ?, error = ?, lease_until = NULL, run_after = ?, '
+                                   'updated_at = ? WHERE id = ?',
+                                   (QUEUED, message, now + RETRY_BACKOFF * 2 ** (job['attempts'] - 1), now,
+                                    job['id']))
+            else:
+                connection.execute('UPDATE jobs SET status = ?, error = ?, lease_until = NULL, updated_at = ? '
+                                   'WHERE id = ?', (FAILED, message, now, job['id']))
+
+    def _renew_leases(self):
+        with self._lock:
+            ids = list(self._running)
+        if ids:
+            with self._transaction() as connection:
+                connection.execute(f"UPDATE jobs SET lease_until = ? WHERE id IN ({', '.join('?' * len(ids))})",
+                                   [time.time() + LEASE_SECONDS, *ids])
+
+    def _purge(self):
+        with self._transaction() as connection:
+            connection.execute('DELETE FROM jobs WHERE status IN (?, ?) AND updated_at < ?',
+                               (SUCCEEDED, FAILED, time.time() - RETENTION_SECONDS))
+
+
+def in_pool_process():
+    """Whether this process is a job pool process rather than a web process"""
+    return multiprocessing.current_process().name.startswith(POOL_PROCESS_PREFIX)
+
+
+def call(function, payload):
+    """Run a handler in a pool process and return (its result, seconds it ran).
+
+    ``function`` may be a 'module:function' string, imported here first.
+    """
+    if isinstance(function, str):
+        module, name = function.split(':')
+        function = getattr(importlib.import_module(module), name)
+    start = time.perf_counter()
+    result = function(**payload)
+    return result, time.perf_counter() - start
+
+
+def status_body(job):
+    body = {key: job[key] for key in ('id', 'kind', 'status', 'attempts', 'max_attempts', 'error',
+                                      'created_at', 'updated_at')}
+    body['status_url'] = url_for('jobs.status', job_id=job['id'])
+    body['result_url'] = url_for('jobs.result', job_id=job['id'])
+    return body
+
+
+def accepted(job):
+    """202 Accepted pointing at the job's status"""
+    return status_body(job), 202, {'Location': url_for('jobs.status', job_id=job['id'])}
+
+
+def blueprint(queue):
+    """Submit, status and result endpoints for ``queue``"""
+    jobs = Blueprint('jobs', __name__)
+
+    def not_found():
+        return {'error_code': 'JOB001', 'error_message': 'Job not found'}, 404
+
+    @jobs.route('/jobs', methods=['POST'])
+    def submit():
+        data = request.get_json(silent=True)
+        data = data if isinstance(data, dict) else {}
+        if data.get('kind') not in queue.handlers:
+            return {'error_code': 'JOB003', 'error_message': 'Unknown job kind'}, 400
+        if not isinstance(data.get('payload', {}), dict):
+            return {'error_code': 'JOB003', 'error_message': 'Job payload must be an object'}, 400
+        return queue.accept(data['kind'], data.get('payload'))
+
+    @jobs.route('/jobs/<job_id>')
+    def status(job_id):
+        job = queue.get(job_id)
+        if job is None:
+            return not_found()
+        return status_body(job), 200
+
+    @jobs.route('/jobs/<job_id>/result')
+    def result(job_id):
+        job = queue.get(job_id)
+        if job is None:
+            return not_found()
+        if job['status'] == FAILED:
+            return {'error_code': 'JOB002', 'error_message': job['error']}, 500
+        if job['status'] != SUCCEEDED:
+            return status_body(job), 202, {'Retry-After': '1'}
+        return job['result'], 200, {'Content-Type': job['result_type']}
+
+    return jobs
@@ -0,0 +1,81 @@
+"""Keep-alive HTTP load test for the Lab6 API (either app.py or asgi.py).
+
+Opens many persistent connections from one asyncio process and issues GETs
+on each as fast as the server answers, then reports throughput and latency
+percentiles. Uses only the standard library.
+
+    uvicorn asgi:app --port 8000 &
+    python loadtest.py http://127.0.0.1:8000 --connections 2000 --seconds 10
+
+The paths cycle through /api/student/<id> for ids 1..--ids; seed the
+database first (e.g. with POST /api/student/batch) so they exist. Thousands
+of connections need a raised open-files limit (ulimit -n). The summary is
+the one the benchmarks harness reports (benchmarks/report.py), so run this
+from a checkout of the whole repository.
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+from urllib.parse import urlsplit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from benchmarks.report import summarize  # noqa: E402
+
+
+async def client(host, port, paths, deadline, latencies, errors):
+    try:
+        reader, writer = await asyncio.open_connection(host, port)
+    except OSError:
+        errors.append('connect')
+        return
+    i = 0
+    try:
+        while time.perf_counter() < deadline:
+            path = paths[i % len(paths)]
+            i += 1
+            start = time.perf_counter()
+            writer.write(f'GET {path} HTTP/1.1\r\nHost: {host}\r\nConnection: keep-alive\r\n\r\n'.encode())
+            head = await reader.readuntil(b'\r\n\r\n')
+            status = int(head.split(b' ', 2)[1])
+            length = 0
+            for line in head.split(b'\r\n'):
+                if line.lower().startswith(b'content-length:'):
+                    length = int(line.split(b':', 1)[1])
+            await reader.readexactly(length)
+            latencies.append(time.perf_counter() - start)
+            if status >= 500:
+                errors.append(status)
+    except (OSError, asyncio.IncompleteReadError, asyncio.LimitOverrunError):
+        errors.append('connection')
+    finally:
+        writer.close()
+
+
+async def run(args):
+    url = urlsplit(args.url)
+    paths = [f'/api/student/{i}' for i in range(1, args.ids + 1)]
+    latencies, errors = [], []
+    deadline = time.perf_counter() + args.seconds
+    started = time.perf_counter()
+    await asyncio.gather(*(client(url.hostname, url.port or 80, paths, deadline, latencies, errors)
+                           for _ in range(args.connections)))
+    elapsed = time.perf_counter() - started
+
+    return {'connections': args.connections, **summarize(latencies, elapsed, len(errors))}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('url')
+    parser.add_argument('--connections', type=int, default=1000)
+    parser.add_argument('--seconds', type=float, default=10)
+    parser.add_argument('--ids', type=int, default=100)
+    args = parser.parse_args()
+    print(json.dumps(asyncio.run(run(args)), indent=2))
+
+
+if __name__ == '__main__':
+    main()
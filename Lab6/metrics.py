@@ -0,0 +1,305 @@
+"""Request metrics and slow-request profiling for the lab apps.
+
+``install(app, env_prefix)`` wraps the WSGI app so every request is timed
+per URL rule (including streamed bodies) and serves the collected numbers in
+Prometheus text format at /metrics. ``instrument_engine(engine)`` adds SQL
+statement counts and times through SQLAlchemy engine events, attributed to
+the request that ran them. ``span(name)`` times any other block of code;
+Lab4 uses it for CSV parsing and for waiting on plot jobs, and jobs.py
+records each background job's run time as ``job:<kind>``.
+
+The sampling profiler is off unless ``<PREFIX>_PROFILE_SLOW_MS`` is set
+(``<PREFIX>`` is LAB4, LAB5 or LAB6):
+
+    <PREFIX>_PROFILE_SLOW_MS      write a profile for requests slower than this
+    <PREFIX>_PROFILE_INTERVAL_MS  stack sampling interval (default 5)
+    <PREFIX>_PROFILE_DIR          output directory (default profiles/ next to the app)
+
+While it is on, a background thread samples the stacks of in-flight requests.
+Requests past the threshold write their samples as collapsed stacks, one
+"outer;inner;leaf count" line each, which flamegraph.pl and speedscope read
+directly.
+
+Lab4, lab5 and Lab6 each ship a copy of this module; check_shared.py at the
+repository root fails when the copies differ.
+"""
+import collections
+import contextvars
+import os
+import re
+import sys
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+
+from flask import Response, request
+
+import settings
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 25, 50, 100)
+
+
+def _escape(value):
+    return str(value).replace('\\', r'\\').replace('"', r'\"').replace('\n', r'\n')
+
+
+def _label_text(names, values):
+    return ','.join(f'{name}="{_escape(value)}"' for name, value in zip(names, values))
+
+
+class Counter:
+    def __init__(self, name, help, labels):
+        self.name = name
+        self.help = help
+        self.labels = labels
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *label_values, amount=1):
+        with self._lock:
+            self._series[label_values] = self._series.get(label_values, 0) + amount
+
+    def expose(self):
+        lines = [f'# HELP {self.name} {self.help}', f'# TYPE {self.name} counter']
+        with self._lock:
+            series = sorted(self._series.items())
+        for values, total in series:
+            lines.append(f'{self.name}{{{_label_text(self.labels, values)}}} {total}')
+        return lines
+
+
+class Histogram:
+    def __init__(self, name, help, labels, buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.help = help
+        self.labels = labels
+        self.buckets = buckets
+        # label values -> [per-bucket counts (last one is +Inf), sum]
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value, *label_values):
+        slot = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(label_values)
+            if series is None:
+                series = self._series[label_values] = [[0] * (len(self.buckets) + 1), 0]
+            series[0][slot] += 1
+            series[1] += value
+
+    def expose(self):
+        lines = [f'# HELP {self.name} {self.help}', f'# TYPE {self.name} histogram']
+        with self._lock:
+            series = sorted((values, (list(counts), total)) for values, (counts, total) in self._series.items())
+        for values, (counts, total) in series:
+            labels = _label_text(self.labels, values)
+            prefix = labels + ',' if labels else ''
+            cumulative = 0
+            for bound, count in zip(self.buckets + ('+Inf',), counts):
+                cumulative += count
+                lines.append(f'{self.name}_bucket{{{prefix}le="{bound}"}} {cumulative}')
+            lines.append(f'{self.name}_sum{{{labels}}} {total}')
+            lines.append(f'{self.name}_count{{{labels}}} {cumulative}')
+        return lines
+
+
+REQUEST_SECONDS = Histogram('http_request_duration_seconds', 'Request latency by URL rule',
+                            ('method', 'endpoint'))
+REQUESTS = Counter('http_requests_total', 'Requests by URL rule and response status',
+                   ('method', 'endpoint', 'status'))
+REQUEST_QUERIES = Histogram('http_request_sql_queries', 'SQL statements executed per request',
+                            ('endpoint',), buckets=COUNT_BUCKETS)
+SQL_SECONDS = Histogram('sql_query_duration_seconds', 'SQL statement execution time',
+                        ('endpoint',))
+SPAN_SECONDS = Histogram('span_duration_seconds', 'Time spent in instrumented code sections',
+                         ('span',))
+REGISTRY = (REQUEST_SECONDS, REQUESTS, REQUEST_QUERIES, SQL_SECONDS, SPAN_SECONDS)
+
+
+class RequestState:
+    def __init__(self, method):
+        self.method = method
+        self.endpoint = 'unmatched'
+        self.status = '500'
+        self.queries = 0
+        self.thread_id = threading.get_ident()
+        self.samples = None
+        self.start = time.perf_counter()
+
+
+_current = contextvars.ContextVar('metrics_request', default=None)
+
+
+@contextmanager
+def span(name):
+    """Record the time spent in the block under ``span_duration_seconds``"""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        SPAN_SECONDS.observe(time.perf_counter() - start, name)
+
+
+class MetricsMiddleware:
+    def __init__(self, wsgi_app, profiler=None):
+        self.wsgi_app = wsgi_app
+        self.profiler = profiler
+
+    def __call__(self, environ, start_response):
+        state = RequestState(environ.get('REQUEST_METHOD', 'GET'))
+        _current.set(state)
+        if self.profiler:
+            self.profiler.start(state)
+
+        def capture_status(status, headers, exc_info=None):
+            state.status = status.split(' ', 1)[0]
+            return start_response(status, headers, exc_info)
+
+        try:
+            body = self.wsgi_app(environ, capture_status)
+        except BaseException:
+            self._finish(state)
+            raise
+        return TimedBody(body, lambda: self._finish(state))
+
+    def _finish(self, state):
+        elapsed = time.perf_counter() - state.start
+        REQUEST_SECONDS.observe(elapsed, state.method, state.endpoint)
+        REQUESTS.inc(state.method, state.endpoint, state.status)
+        REQUEST_QUERIES.observe(state.queries, state.endpoint)
+        if self.profiler:
+            self.profiler.stop(state, elapsed)
+        _current.set(None)
+
+
+class TimedBody:
+    """Response iterable that reports completion once, when it is exhausted or closed"""
+
+    def __init__(self, body, finish):
+        self.body = body
+        self._finish = finish
+
+    def __iter__(self):
+        try:
+            yield from self.body
+        finally:
+            self._done()
+
+    def close(self):
+        try:
+            if hasattr(self.body, 'close'):
+                self.body.close()
+        finally:
+            self._done()
+
+    def _done(self):
+        finish, self._finish = self._finish, None
+        if finish is not None:
+            finish()
+
+
+def _frame_name(frame):
+    code = frame.f_code
+    return f'{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})'
+
+
+def _collapsed_stack(frame):
+    names = []
+    while frame is not None:
+        names.append(_frame_name(frame))
+        frame = frame.f_back
+    return ';'.join(reversed(names))
+
+
+class SamplingProfiler:
+    def __init__(self, threshold, interval, directory):
+        self.threshold = threshold
+        self.interval = interval
+        self.directory = directory
+        self._active = {}
+        self._lock = threading.Lock()
+        self._thread = None
+
+    def start(self, state):
+        state.samples = collections.Counter()
+        with self._lock:
+            self._active[state.thread_id] = state.samples
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._sample, name='metrics-profiler', daemon=True)
+                self._thread.start()
+
+    def stop(self, state, elapsed):
+        with self._lock:
+            self._active.pop(state.thread_id, None)
+        if elapsed >= self.threshold and state.samples:
+            self._write(state, elapsed)
+
+    def _sample(self):
+        while True:
+            time.sleep(self.interval)
+            with self._lock:
+                active = list(self._active.items())
+            if not active:
+                continue
+            # Walk the stacks without holding the lock: dropping the frame
+            # references can finalize an abandoned response, whose cleanup
+            # calls stop() on this thread.
+            frames = sys._current_frames()
+            for thread_id, samples in active:
+                frame = frames.get(thread_id)
+                if frame is not None:
+                    samples[_collapsed_stack(frame)] += 1
+            del frames, frame
+
+    def _write(self, state, elapsed):
+        os.makedirs(self.directory, exist_ok=True)
+        slug = re.sub(r'[^A-Za-z0-9]+', '_', f'{state.method}{state.endpoint}').strip('_')
+        name = f'{time.strftime("%Y%m%d-%H%M%S")}-{elapsed * 1000:.0f}ms-{slug}.folded'
+        with open(os.path.join(self.directory, name), 'w') as f:
+            for stack, count in state.samples.most_common():
+                f.write(f'{stack} {count}\n')
+
+
+def _label_request():
+    state = _current.get()
+    if state is not None and request.url_rule is not None:
+        state.endpoint = request.url_rule.rule
+
+
+def metrics_view():
+    lines = []
+    for metric in REGISTRY:
+        lines.extend(metric.expose())
+    return Response('\n'.join(lines) + '\n', mimetype='text/plain; version=0.0.4')
+
+
+def install(app, env_prefix):
+    env = settings.reader(env_prefix)
+    profiler = None
+    slow_ms = env('PROFILE_SLOW_MS', '')
+    if slow_ms:
+        profiler = SamplingProfiler(threshold=float(slow_ms) / 1000,
+                                    interval=float(env('PROFILE_INTERVAL_MS', 5)) / 1000,
+                                    directory=env('PROFILE_DIR', os.path.join(app.root_path, 'profiles')))
+
+    app.wsgi_app = MetricsMiddleware(app.wsgi_app, profiler)
+    app.before_request(_label_request)
+    app.add_url_rule('/metrics', 'metrics', metrics_view)
+
+
+def instrument_engine(engine):
+    from sqlalchemy import event  # imported here because Lab4 has no database
+
+    @event.listens_for(engine, 'before_cursor_execute')
+    def start_query(conn, cursor, statement, parameters, context, executemany):
+        conn.info['metrics_query_start'] = time.perf_counter()
+
+    @event.listens_for(engine, 'after_cursor_execute')
+    def end_query(conn, cursor, statement, parameters, context, executemany):
+        elapsed = time.perf_counter() - conn.info['metrics_query_start']
+        state = _current.get()
+        if state is not None:
+            state.queries += 1
+        SQL_SECONDS.observe(elapsed, state.endpoint if state is not None else 'none')
@@ -0,0 +1,35 @@
+"""Background job handlers for the Lab6 API, run in job_queue's process pool.
+
+app.py registers these as ``'tasks:<name>'`` strings rather than importing
+this module, so only pool processes import it, and there ``import app``
+loads the one app that ingest_marks.py also uses, even when the server was
+started with ``python app.py`` (see jobs.py).
+"""
+from app import BATCH_IMPORTERS, Course, Student, app, batch_results, delete_course, delete_student
+from ingest_marks import DEFAULT_CSV, ingest
+
+
+def delete_course_job(course_id):
+    with app.app_context():
+        course = Course.query.get(course_id)
+        if course:
+            delete_course(course)
+    return {}
+
+
+def delete_student_job(student_id):
+    with app.app_context():
+        student = Student.query.get(student_id)
+        if student:
+            delete_student(student)
+    return {}
+
+
+def import_batch_job(entity, items):
+    with app.app_context():
+        return list(batch_results(items, BATCH_IMPORTERS[entity]))
+
+
+def ingest_marks_job():
+    with app.app_context():
+        return ingest(DEFAULT_CSV)
@@ -0,0 +1,24 @@
+"""Reproducible benchmarks for Lab4, lab5 and Lab6.
+
+Every run starts from synthetic data built with a fixed seed, drives the
+apps in fresh interpreters (each lab has its own top-level ``app`` module)
+and reports latency percentiles and throughput as JSON:
+
+    python -m benchmarks generate --out /tmp/bench-data
+    python -m benchmarks run --output results.json
+    python -m benchmarks load --seconds 10 --connections 32
+    python -m benchmarks compare results.json
+
+``run`` sends requests through each app's Flask test client, so it measures
+the route code without any server or socket in the way. ``load`` starts each
+app on a threaded werkzeug server (or targets ``--url``) and hits it from
+many concurrent connections. ``compare`` checks a result file against
+baseline.json and exits non-zero when p95 latency or throughput regressed
+past ``--tolerance``. Timings depend on the machine, so re-record the
+baseline (``run --save-baseline``) when moving to a different one.
+"""
+import os
+
+REPO = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+LABS = ('Lab4', 'lab5', 'Lab6')
+BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'baseline.json')
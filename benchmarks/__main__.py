@@ -0,0 +1,191 @@
+"""Command line for the benchmark suite; see benchmarks/__init__.py."""
+import argparse
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+
+from . import BASELINE, LABS, REPO, datagen, load, report
+from .scenarios import load_mix
+
+
+def lab_env(lab, data_dir):
+    env = {k: v for k, v in os.environ.items()
+           if not (k.startswith(('LAB4_', 'LAB5_', 'LAB6_')))}
+    env['PYTHONPATH'] = os.pathsep.join([os.path.join(REPO, lab), REPO])
+    env['LAB5_DATABASE_URI'] = 'sqlite:///' + os.path.join(data_dir, 'lab5.sqlite3')
+    env['LAB6_DATABASE_URI'] = 'sqlite:///' + os.path.join(data_dir, 'lab6.sqlite3')
+    for prefix in ('LAB4', 'LAB6'):
+        env[f'{prefix}_JOBS_DB'] = os.path.join(data_dir, f'{prefix.lower()}-jobs.sqlite3')
+    return env
+
+
+def worker_command(lab, command, options):
+    return [sys.executable, '-m', 'benchmarks.worker', lab, command, json.dumps(options)]
+
+
+def run_worker(lab, command, options, data_dir):
+    out = subprocess.run(worker_command(lab, command, options), cwd=data_dir, env=lab_env(lab, data_dir),
+                         check=True, capture_output=True, text=True)
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+
+def data_options(args):
+    return {'students': args.students, 'courses': args.courses,
+            'per_student': args.per_student, 'seed': args.seed}
+
+
+def generate(args, out):
+    """Write data.csv plus the lab5 and Lab6 databases into ``out``"""
+    os.makedirs(out, exist_ok=True)
+    for name in ('lab5.sqlite3', 'lab6.sqlite3'):
+        for suffix in ('', '-wal', '-shm'):
+            if os.path.exists(os.path.join(out, name + suffix)):
+                os.remove(os.path.join(out, name + suffix))
+    datagen.generate_csv(os.path.join(out, 'data.csv'), args.students, args.courses,
+                         args.per_student, args.seed)
+    for lab in ('lab5', 'Lab6'):
+        run_worker(lab, 'seed', data_options(args), out)
+
+
+def prepared_data(args):
+    """Directory with freshly generated data, and whether to delete it afterwards"""
+    if args.data:
+        generate(args, args.data)
+        return args.data, False
+    scratch = tempfile.mkdtemp(prefix='lab-bench-')
+    generate(args, scratch)
+    return scratch, True
+
+
+def cmd_generate(args):
+    generate(args, args.out)
+    print(f'wrote data.csv, lab5.sqlite3 and lab6.sqlite3 to {args.out}')
+
+
+def cmd_run(args):
+    data_dir, cleanup = prepared_data(args)
+    try:
+        results = {}
+        options = dict(data_options(args), requests=args.requests, warmup=args.warmup)
+        for lab in args.labs:
+            results.update(run_worker(lab, 'inprocess', options, data_dir))
+    finally:
+        if cleanup:
+            shutil.rmtree(data_dir, ignore_errors=True)
+    return finish(args, 'inprocess', results)
+
+
+def cmd_load(args):
+    if args.url and len(args.labs) != 1:
+        sys.exit('--url needs exactly one --labs entry')
+    data_dir, cleanup = prepared_data(args)
+    try:
+        results = {}
+        for lab in args.labs:
+            requests = load_mix(lab, args.students, args.courses, seed=args.seed)
+            if args.url:
+                results[f'{lab}.load'] = load.run(args.url, requests, args.connections, args.seconds)
+                continue
+            server = subprocess.Popen(worker_command(lab, 'serve', {}), cwd=data_dir,
+                                      env=lab_env(lab, data_dir), stdout=subprocess.PIPE,
+                                      stderr=subprocess.DEVNULL, text=True)
+            try:
+                port = json.loads(server.stdout.readline())['port']
+                url = f'http://127.0.0.1:{port}'
+                results[f'{lab}.load'] = load.run(url, requests, args.connections, args.seconds)
+            finally:
+                server.terminate()
+                server.wait()
+    finally:
+        if cleanup:
+            shutil.rmtree(data_dir, ignore_errors=True)
+    return finish(args, 'load', results)
+
+
+def finish(args, mode, results):
+    params = dict(data_options(args), mode=mode)
+    if mode == 'inprocess':
+        params.update(requests=args.requests, warmup=args.warmup)
+    else:
+        params.update(connections=args.connections, seconds=args.seconds)
+    result = {'environment': report.environment(), 'params': params, 'results': results}
+    report.write(result, args.output)
+    if args.save_baseline:
+        save_baseline(result, args.baseline)
+    if args.compare:
+        return check(result, report.read(args.baseline), args.tolerance)
+    return 0
+
+
+def save_baseline(result, path):
+    """Merge ``result`` into the baseline file, keeping scenarios it did not run"""
+    baseline = report.read(path) if os.path.exists(path) else {'results': {}}
+    baseline['environment'] = result['environment']
+    baseline.setdefault('params', {})[result['params']['mode']] = result['params']
+    baseline['results'].update(result['results'])
+    report.write(baseline, path)
+
+
+def check(result, baseline, tolerance):
+    rows = report.compare(result, baseline, tolerance)
+    report.print_comparison(rows, out=sys.stderr)
+    return 1 if any(row[-1] for row in rows) else 0
+
+
+def cmd_compare(args):
+    return check(report.read(args.results), report.read(args.baseline), args.tolerance)
+
+
+def main():
+    parser = argparse.ArgumentParser(prog='python -m benchmarks', description=__doc__.splitlines()[0])
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    def add_data_options(sub):
+        sub.add_argument('--students', type=int, default=2000)
+        sub.add_argument('--courses', type=int, default=50)
+        sub.add_argument('--per-student', type=int, default=5)
+        sub.add_argument('--seed', type=int, default=0)
+
+    def add_output_options(sub):
+        add_data_options(sub)
+        sub.add_argument('--labs', nargs='+', choices=LABS, default=list(LABS))
+        sub.add_argument('--data', help='generate into this directory instead of a temporary one')
+        sub.add_argument('--output', default='-', help='result file (default: stdout)')
+        sub.add_argument('--baseline', default=BASELINE)
+        sub.add_argument('--save-baseline', action='store_true', help='also write the result to --baseline')
+        sub.add_argument('--compare', action='store_true', help='compare with --baseline afterwards')
+        sub.add_argument('--tolerance', type=float, default=0.25)
+
+    sub = commands.add_parser('generate', help='write synthetic data files')
+    add_data_options(sub)
+    sub.add_argument('--out', required=True)
+    sub.set_defaults(func=cmd_generate)
+
+    sub = commands.add_parser('run', help='in-process route benchmarks')
+    add_output_options(sub)
+    sub.add_argument('--requests', type=int, default=300, help='measured requests per scenario')
+    sub.add_argument('--warmup', type=int, default=20)
+    sub.set_defaults(func=cmd_run)
+
+    sub = commands.add_parser('load', help='concurrent HTTP load')
+    add_output_options(sub)
+    sub.add_argument('--connections', type=int, default=32)
+    sub.add_argument('--seconds', type=float, default=10)
+    sub.add_argument('--url', help='target an already running server instead of starting one')
+    sub.set_defaults(func=cmd_load)
+
+    sub = commands.add_parser('compare', help='compare a result file with the baseline')
+    sub.add_argument('results')
+    sub.add_argument('--baseline', default=BASELINE)
+    sub.add_argument('--tolerance', type=float, default=0.25)
+    sub.set_defaults(func=cmd_compare)
+
+    args = parser.parse_args()
+    sys.exit(args.func(args) or 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,56 @@
+"""Synthetic data: a marks CSV for Lab4 and seeded databases for lab5/Lab6.
+
+All generators take the same shape (``students`` x ``courses`` with
+``per_student`` enrollments each) and a seed, so the CSV and both databases
+describe the same enrollments and every run sees identical data.
+"""
+import random
+
+FIRST_STUDENT = 1001
+FIRST_COURSE = 2001
+
+
+def enrollments(students, courses, per_student, seed):
+    """(student index, course index, marks) triples, grouped by student"""
+    rng = random.Random(seed)
+    per_student = min(per_student, courses)
+    for student in range(students):
+        for course in sorted(rng.sample(range(courses), per_student)):
+            yield student, course, rng.randint(0, 100)
+
+
+def generate_csv(path, students, courses, per_student, seed=0):
+    """Write a Lab4 data.csv; student and course ids follow the sample file"""
+    with open(path, 'w') as f:
+        f.write('Student id, Course id, Marks\n')
+        for student, course, marks in enrollments(students, courses, per_student, seed):
+            f.write(f'{FIRST_STUDENT + student}, {FIRST_COURSE + course}, {marks}\n')
+
+
+def _course_rows(courses):
+    return [{'course_id': i + 1, 'course_code': f'C{i + 1:04d}', 'course_name': f'Course {i + 1}',
+             'course_description': f'Synthetic course {i + 1}'} for i in range(courses)]
+
+
+def _student_rows(students):
+    return [{'student_id': i + 1, 'roll_number': f'R{i + 1:06d}', 'first_name': f'First{i + 1}',
+             'last_name': f'Last{i + 1}'} for i in range(students)]
+
+
+def seed_database(lab, app_module, students, courses, per_student, seed=0):
+    """Fill an empty lab5 or Lab6 database through the app's own models"""
+    db = app_module.db
+    if lab == 'lab5':
+        enrollment_keys = ('estudent_id', 'ecourse_id')
+    else:
+        enrollment_keys = ('student_id', 'course_id')
+
+    with app_module.app.app_context():
+        session = db.session
+        session.execute(db.insert(app_module.Course), _course_rows(courses))
+        session.execute(db.insert(app_module.Student), _student_rows(students))
+        session.execute(db.insert(app_module.Enrollment), [
+            dict(zip(enrollment_keys, (student + 1, course + 1)))
+            for student, course, _ in enrollments(students, courses, per_student, seed)
+        ])
+        session.commit()
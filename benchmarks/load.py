@@ -0,0 +1,59 @@
+"""Concurrent HTTP load generator (standard library asyncio).
+
+Each connection sends one request at a time with ``Connection: close``,
+since the werkzeug development server does not keep connections alive, and
+reads the response to EOF before the next one.
+"""
+import asyncio
+import time
+from urllib.parse import urlsplit
+
+from . import report
+
+
+async def _send(host, port, method, path, body):
+    reader, writer = await asyncio.open_connection(host, port)
+    try:
+        head = f'{method} {path} HTTP/1.1\r\nHost: {host}\r\nConnection: close\r\n'
+        if body is not None:
+            data = body.encode()
+            head += f'Content-Type: application/x-www-form-urlencoded\r\nContent-Length: {len(data)}\r\n'
+        else:
+            data = b''
+        writer.write(head.encode() + b'\r\n' + data)
+        response = await reader.read()
+    finally:
+        writer.close()
+    return int(response.split(b' ', 2)[1])
+
+
+async def _connection(host, port, requests, offset, deadline, latencies, errors):
+    i = offset
+    while time.perf_counter() < deadline:
+        method, path, body = requests[i % len(requests)]
+        i += 1
+        start = time.perf_counter()
+        try:
+            status = await _send(host, port, method, path, body)
+        except (OSError, IndexError, ValueError):
+            errors.append('connection')
+            continue
+        latencies.append(time.perf_counter() - start)
+        if status >= 400:
+            errors.append(status)
+
+
+async def _run(url, requests, connections, seconds):
+    parts = urlsplit(url)
+    latencies, errors = [], []
+    started = time.perf_counter()
+    deadline = started + seconds
+    await asyncio.gather(*(_connection(parts.hostname, parts.port or 80, requests,
+                                       n * 7, deadline, latencies, errors)
+                           for n in range(connections)))
+    return report.summarize(latencies, time.perf_counter() - started, len(errors))
+
+
+def run(url, requests, connections=32, seconds=10):
+    """Drive ``url`` with ``connections`` concurrent clients cycling ``requests``"""
+    return asyncio.run(_run(url, requests, connections, seconds))
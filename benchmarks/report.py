@@ -0,0 +1,73 @@
+"""Result summaries and baseline comparison."""
+import json
+import platform
+import statistics
+import sys
+
+
+def percentile(sorted_values, q):
+    if not sorted_values:
+        return 0.0
+    return sorted_values[min(len(sorted_values) - 1, int(q * len(sorted_values)))]
+
+
+def summarize(latencies, elapsed, errors):
+    """Throughput and latency percentiles (ms) for one scenario"""
+    latencies = sorted(latencies)
+    return {
+        'requests': len(latencies),
+        'errors': errors,
+        'requests_per_second': round(len(latencies) / elapsed, 1) if elapsed else 0.0,
+        'latency_ms': {
+            'p50': round(percentile(latencies, 0.50) * 1000, 3),
+            'p95': round(percentile(latencies, 0.95) * 1000, 3),
+            'p99': round(percentile(latencies, 0.99) * 1000, 3),
+            'mean': round(statistics.fmean(latencies) * 1000, 3) if latencies else 0.0,
+        },
+    }
+
+
+def environment():
+    return {
+        'python': platform.python_version(),
+        'implementation': platform.python_implementation(),
+        'platform': platform.platform(),
+        'machine': platform.machine(),
+    }
+
+
+def write(report, path):
+    text = json.dumps(report, indent=2, sort_keys=True)
+    if path in (None, '-'):
+        print(text)
+    else:
+        with open(path, 'w') as f:
+            f.write(text + '\n')
+
+
+def read(path):
+    with open(path) as f:
+        return json.load(f)
+
+
+def compare(results, baseline, tolerance):
+    """Rows of (key, metric, baseline, current, change, regressed) for shared scenarios"""
+    rows = []
+    for key in sorted(set(results['results']) & set(baseline['results'])):
+        current, reference = results['results'][key], baseline['results'][key]
+        p95, reference_p95 = current['latency_ms']['p95'], reference['latency_ms']['p95']
+        if reference_p95:
+            change = p95 / reference_p95 - 1
+            rows.append((key, 'p95 ms', reference_p95, p95, change, change > tolerance))
+        rps, reference_rps = current['requests_per_second'], reference['requests_per_second']
+        if reference_rps:
+            change = rps / reference_rps - 1
+            rows.append((key, 'req/s', reference_rps, rps, change, change < -tolerance))
+    return rows
+
+
+def print_comparison(rows, out=sys.stdout):
+    print(f'{"scenario":<28} {"metric":<7} {"baseline":>10} {"current":>10} {"change":>8}', file=out)
+    for key, metric, reference, current, change, regressed in rows:
+        flag = '  REGRESSED' if regressed else ''
+        print(f'{key:<28} {metric:<7} {reference:>10.2f} {current:>10.2f} {change:>+8.1%}{flag}', file=out)
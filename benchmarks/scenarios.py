@@ -0,0 +1,174 @@
+"""Request scenarios for each lab.
+
+In-process scenarios are ``(name, request, expected statuses)`` entries run in
+order against one app; ``request(client, ctx, i)`` issues the i-th request
+and returns the response. CRUD flows build on each other: the create
+scenario's students are the ones later scenarios update, enroll and delete,
+so every scenario must run the same number of iterations.
+
+Load mixes are read-only ``(method, path, form body)`` lists, so a load run
+can repeat against the same data indefinitely.
+"""
+import random
+from urllib.parse import urlencode
+
+from .datagen import FIRST_COURSE, FIRST_STUDENT
+
+# Histogram requests stay on a few courses so the run measures the cached
+# path instead of one matplotlib render per course.
+HOT_COURSES = 5
+
+
+def _student(ctx):
+    return ctx['rng'].randrange(ctx['students']) + 1
+
+
+def _course(ctx):
+    return ctx['rng'].randrange(ctx['courses']) + 1
+
+
+# --- Lab4 ---
+
+def lab4_student_lookup(client, ctx, i):
+    return client.post('/', data={'ID': 'student_id', 'id_value': str(FIRST_STUDENT + _student(ctx) - 1)})
+
+
+def lab4_course_lookup(client, ctx, i):
+    return client.post('/', data={'ID': 'course_id', 'id_value': str(FIRST_COURSE + _course(ctx) - 1)})
+
+
+def lab4_histogram(client, ctx, i):
+    course = FIRST_COURSE + ctx['rng'].randrange(min(HOT_COURSES, ctx['courses']))
+    return client.get(f'/course/{course}/histogram.png')
+
+
+# --- lab5 ---
+
+def _lab5_created(ctx):
+    if 'created' not in ctx:
+        app_module = ctx['app']
+        with app_module.app.app_context():
+            Student = app_module.Student
+            ctx['created'] = list(app_module.db.session.scalars(
+                app_module.db.select(Student.student_id)
+                .where(Student.roll_number.like('B%'))
+                .order_by(Student.student_id)))
+    return ctx['created']
+
+
+def lab5_index(client, ctx, i):
+    return client.get('/')
+
+
+def lab5_index_page(client, ctx, i):
+    return client.get(f'/?after={_student(ctx)}')
+
+
+def lab5_details(client, ctx, i):
+    return client.get(f'/student/{_student(ctx)}')
+
+
+def lab5_create(client, ctx, i):
+    courses = [f'course_{_course(ctx)}', f'course_{_course(ctx)}']
+    return client.post('/student/create', data={'roll': f'B{i:06d}', 'f_name': 'Bench', 'l_name': str(i),
+                                                'courses': courses})
+
+
+def lab5_update(client, ctx, i):
+    student_id = _lab5_created(ctx)[i]
+    return client.post(f'/student/{student_id}/update', data={'f_name': 'Updated', 'l_name': str(i),
+                                                              'courses': [f'course_{_course(ctx)}']})
+
+
+def lab5_delete(client, ctx, i):
+    return client.get(f'/student/{_lab5_created(ctx)[i]}/delete')
+
+
+# --- Lab6 ---
+
+def _lab6_course_for(ctx, i):
+    return i % ctx['courses'] + 1
+
+
+def lab6_student_get(client, ctx, i):
+    return client.get(f'/api/student/{_student(ctx)}')
+
+
+def lab6_student_list(client, ctx, i):
+    return client.get(f'/api/student?limit=100&after={_student(ctx)}')
+
+
+def lab6_student_create(client, ctx, i):
+    response = client.post('/api/student', json={'roll_number': f'B{i:06d}', 'first_name': 'Bench',
+                                                 'last_name': str(i)})
+    if response.status_code == 201:
+        ctx.setdefault('created', []).append(response.get_json()['student_id'])
+    return response
+
+
+def lab6_student_update(client, ctx, i):
+    return client.put(f'/api/student/{ctx["created"][i]}', json={'last_name': f'Updated {i}'})
+
+
+def lab6_enroll(client, ctx, i):
+    return client.post(f'/api/student/{ctx["created"][i]}/course', json={'course_id': _lab6_course_for(ctx, i)})
+
+
+def lab6_enrollments(client, ctx, i):
+    return client.get(f'/api/student/{_student(ctx)}/course')
+
+
+def lab6_unenroll(client, ctx, i):
+    return client.delete(f'/api/student/{ctx["created"][i]}/course/{_lab6_course_for(ctx, i)}')
+
+
+def lab6_student_delete(client, ctx, i):
+    return client.delete(f'/api/student/{ctx["created"][i]}')
+
+
+INPROCESS = {
+    'Lab4': [
+        ('student_lookup', lab4_student_lookup, (200,)),
+        ('course_lookup', lab4_course_lookup, (200,)),
+        ('course_histogram', lab4_histogram, (200,)),
+    ],
+    'lab5': [
+        ('index', lab5_index, (200,)),
+        ('index_page', lab5_index_page, (200,)),
+        ('details', lab5_details, (200,)),
+        ('create', lab5_create, (302,)),
+        ('update', lab5_update, (302,)),
+        ('delete', lab5_delete, (302,)),
+    ],
+    'Lab6': [
+        ('student_get', lab6_student_get, (200,)),
+        ('student_list', lab6_student_list, (200,)),
+        ('student_create', lab6_student_create, (201,)),
+        ('student_update', lab6_student_update, (200,)),
+        ('enroll', lab6_enroll, (201,)),
+        ('enrollments', lab6_enrollments, (200,)),
+        ('unenroll', lab6_unenroll, (200,)),
+        ('student_delete', lab6_student_delete, (200,)),
+    ],
+}
+
+
+def load_mix(lab, students, courses, size=200, seed=0):
+    """Read-only requests for the HTTP load mode, cycled by every connection"""
+    rng = random.Random(seed)
+    requests = []
+    for n in range(size):
+        student = rng.randrange(students) + 1
+        course = rng.randrange(courses) + 1
+        if lab == 'Lab4':
+            if n % 2:
+                form = {'ID': 'student_id', 'id_value': FIRST_STUDENT + student - 1}
+            else:
+                form = {'ID': 'course_id', 'id_value': FIRST_COURSE + course - 1}
+            requests.append(('POST', '/', urlencode(form)))
+        elif lab == 'lab5':
+            requests.append(('GET', ('/', f'/?after={student}', f'/student/{student}')[n % 3], None))
+        else:
+            requests.append(('GET', (f'/api/student/{student}', f'/api/student?limit=100&after={student}',
+                                     f'/api/student/{student}/course', f'/api/course/{course}')[n % 4], None))
+    return requests
@@ -0,0 +1,66 @@
+"""Runs inside a lab's interpreter: ``python -m benchmarks.worker LAB COMMAND OPTIONS``.
+
+The parent puts the lab directory first on PYTHONPATH so ``import app``
+loads that lab, and passes OPTIONS as a JSON object. Results are printed as
+one JSON line on stdout.
+"""
+import json
+import random
+import sys
+import time
+
+from . import datagen, report
+from .scenarios import INPROCESS
+
+
+def seed(lab, options):
+    import app
+    datagen.seed_database(lab, app, options['students'], options['courses'],
+                          options['per_student'], options['seed'])
+    return {'seeded': lab}
+
+
+def inprocess(lab, options):
+    import app
+    client = app.app.test_client()
+    ctx = {'app': app, 'rng': random.Random(options['seed']),
+           'students': options['students'], 'courses': options['courses']}
+    warmup, requests = options['warmup'], options['requests']
+
+    results = {}
+    for name, request, expected in INPROCESS[lab]:
+        for i in range(warmup):
+            request(client, ctx, i)
+        latencies, errors = [], 0
+        started = time.perf_counter()
+        for i in range(warmup, warmup + requests):
+            start = time.perf_counter()
+            response = request(client, ctx, i)
+            response.get_data()
+            latencies.append(time.perf_counter() - start)
+            response.close()
+            if response.status_code not in expected:
+                errors += 1
+        results[f'{lab}.{name}'] = report.summarize(latencies, time.perf_counter() - started, errors)
+    return results
+
+
+def serve(lab, options):
+    from werkzeug.serving import make_server
+
+    import app
+    server = make_server('127.0.0.1', options.get('port', 0), app.app, threaded=True)
+    print(json.dumps({'port': server.server_port}), flush=True)
+    server.serve_forever()
+
+
+COMMANDS = {'seed': seed, 'inprocess': inprocess, 'serve': serve}
+
+
+def main():
+    lab, command, options = sys.argv[1], sys.argv[2], json.loads(sys.argv[3])
+    print(json.dumps(COMMANDS[command](lab, options)), flush=True)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,73 @@
+"""Check that the modules the labs share are still identical in every lab.
+
+Each lab is run and submitted as a standalone directory (``cd Lab6 &&
+python app.py``), so a module several labs use is copied into each of them
+rather than imported from a common package. Edit any copy, then bring the
+others in line and check:
+
+    python check_shared.py --sync Lab6   # copy Lab6's versions to the other labs
+    python check_shared.py               # exits non-zero with a diff when copies differ
+"""
+import argparse
+import difflib
+import os
+import shutil
+import sys
+
+REPO = os.path.dirname(os.path.abspath(__file__))
+
+# module: labs that ship a copy
+SHARED = {
+    'settings.py': ('Lab4', 'lab5', 'Lab6'),
+    'metrics.py': ('Lab4', 'lab5', 'Lab6'),
+    'jobs.py': ('Lab4', 'Lab6'),
+    'rendering.py': ('Lab4', 'lab5'),
+    'db_profile.py': ('lab5', 'Lab6'),
+    'query_budget.py': ('lab5', 'Lab6'),
+}
+
+
+def read(lab, module):
+    with open(os.path.join(REPO, lab, module)) as f:
+        return f.read()
+
+
+def check():
+    """Print a diff for every copy that differs from the first lab's; returns the number of them"""
+    drifted = 0
+    for module, labs in SHARED.items():
+        reference = read(labs[0], module)
+        for lab in labs[1:]:
+            copy = read(lab, module)
+            if copy != reference:
+                drifted += 1
+                sys.stdout.writelines(difflib.unified_diff(
+                    reference.splitlines(True), copy.splitlines(True),
+                    f'{labs[0]}/{module}', f'{lab}/{module}'))
+    return drifted
+
+
+def sync(source):
+    for module, labs in SHARED.items():
+        if source in labs:
+            for lab in labs:
+                if lab != source:
+                    shutil.copyfile(os.path.join(REPO, source, module), os.path.join(REPO, lab, module))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--sync', metavar='LAB', help="copy this lab's shared modules over the other copies first")
+    args = parser.parse_args()
+    if args.sync:
+        sync(args.sync)
+    drifted = check()
+    if drifted:
+        print(f'{drifted} shared module copies differ')
+        return 1
+    print(f'{len(SHARED)} shared modules identical across labs')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
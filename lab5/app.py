@@ -1,19 +1,26 @@
-from flask import Flask, render_template, request, redirect, url_for
+import os
+
+from flask import Flask, abort, render_template, request, redirect, url_for
 from flask_sqlalchemy import SQLAlchemy
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import joinedload
+
+import db_profile
+import metrics
+import rendering
+from catalog import CourseCatalog
 
 app = Flask(__name__)
-app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///database.sqlite3'
+db_profile.configure(app, 'sqlite:///database.sqlite3', 'LAB5')
 app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
 db = SQLAlchemy(app)
+metrics.install(app, 'LAB5')
+# Pages and student-list rows are cached by the values they show; see rendering.py
+renderer = rendering.Renderer(app, 'LAB5')
 
-# --- NEW: Map string form values to integer course IDs ---
-# This map is based on the PDF's HTML spec [cite: 82] and DB spec 
-COURSE_MAP = {
-    "course_1": 1,
-    "course_2": 2,
-    "course_3": 3,
-    "course_4": 4
-}
+with app.app_context():
+    db_profile.install_pragmas(app, db.engine)
+    metrics.instrument_engine(db.engine)
 
 # --- Database Models ---
 # (Models are correct and unchanged)
@@ -36,20 +43,68 @@ class Course(db.Model):
 class Enrollment(db.Model):
     __tablename__ = 'enrollments'
     enrollment_id = db.Column(db.Integer, primary_key=True, autoincrement=True)
-    estudent_id = db.Column(db.Integer, db.ForeignKey('student.student_id'), nullable=False)
-    ecourse_id = db.Column(db.Integer, db.ForeignKey('course.course_id'), nullable=False)
+    estudent_id = db.Column(db.Integer, db.ForeignKey('student.student_id'), nullable=False, index=True)
+    ecourse_id = db.Column(db.Integer, db.ForeignKey('course.course_id'), nullable=False, index=True)
+
+def ensure_indexes():
+    """Create tables, and add enrollment indexes to databases made before they existed"""
+    db.create_all()
+    existing = {index['name'] for index in inspect(db.engine).get_indexes('enrollments')}
+    for index in Enrollment.__table__.indexes:
+        if index.name not in existing:
+            index.create(db.engine)
+
+with app.app_context():
+    ensure_indexes()
+
+# Form values are mapped to course IDs through the cached catalog rather than
+# a hardcoded map, so new rows in the course table show up without a deploy.
+catalog = CourseCatalog(
+    lambda: db.session.execute(
+        db.select(Course.course_id, Course.course_code, Course.course_name).order_by(Course.course_id)
+    ).all(),
+    ttl=int(os.environ.get('LAB5_CATALOG_TTL', 60)))
+
+@event.listens_for(Course, 'after_insert')
+@event.listens_for(Course, 'after_update')
+@event.listens_for(Course, 'after_delete')
+def course_changed(mapper, connection, target):
+    catalog.invalidate()
+
+def selected_course_ids(courses_from_form):
+    """Set of course IDs for the checkbox values, e.g. "course_2" -> 2"""
+    return catalog.course_ids(courses_from_form)
 
 # --- Routes ---
 
+# The student list is paged by primary key: ?after=<last id shown> fetches the
+# next window with an index range scan, and ?start carries the running S. No.
+STUDENTS_PER_PAGE = 100
+
+def student_version(student):
+    """Everything a student's row in the list shows"""
+    return (student.student_id, student.roll_number, student.first_name, student.last_name)
+
 @app.route('/')
 def index():
-    students = Student.query.all()
-    return render_template('index.html', students=students)
+    after = request.args.get('after', 0, type=int)
+    start = request.args.get('start', 0, type=int)
+    students = Student.query.filter(Student.student_id > after) \
+        .order_by(Student.student_id) \
+        .limit(STUDENTS_PER_PAGE + 1) \
+        .all()
+    next_page = None
+    if len(students) > STUDENTS_PER_PAGE:
+        students = students[:STUDENTS_PER_PAGE]
+        next_page = url_for('index', after=students[-1].student_id, start=start + STUDENTS_PER_PAGE)
+    versions = [student_version(student) for student in students]
+    return renderer.page('index.html', (start, next_page, versions),
+                         students=students, student_versions=versions, start=start, next_page=next_page)
 
 @app.route('/student/create', methods=['GET', 'POST'])
 def create_student():
     if request.method == 'GET':
-        return render_template('create.html')
+        return render_template('create.html', courses=catalog.courses)
     
     if request.method == 'POST':
         roll = request.form.get('roll')
@@ -66,25 +121,30 @@ def create_student():
         db.session.add(new_student)
         db.session.flush()
         
-        # --- MODIFIED SECTION ---
-        # Loop through the string values and get the integer ID from our map
-        for course_name in courses_from_form:
-            course_id = COURSE_MAP.get(course_name) # e.g., "course_1" -> 1
-            if course_id:
-                enrollment = Enrollment(estudent_id=new_student.student_id, ecourse_id=course_id)
-                db.session.add(enrollment)
+        # Map the string values to integer IDs and insert them in one statement
+        course_ids = selected_course_ids(courses_from_form)
+        if course_ids:
+            db.session.execute(db.insert(Enrollment), [
+                {'estudent_id': new_student.student_id, 'ecourse_id': course_id}
+                for course_id in sorted(course_ids)
+            ])
         
+        student_id = new_student.student_id
         db.session.commit()
+        # Ids of deleted students can be reused
+        renderer.invalidate('_student_row.html', student_id)
         return redirect(url_for('index'))
 
 @app.route('/student/<int:student_id>/update', methods=['GET', 'POST'])
 def update_student(student_id):
-    student = Student.query.get_or_404(student_id)
+    student = Student.query.options(joinedload(Student.enrollments)) \
+        .filter_by(student_id=student_id).first_or_404()
     
     if request.method == 'GET':
         # This logic is fine, it just passes integers to the template
         current_enrollments = [e.ecourse_id for e in student.enrollments]
-        return render_template('update.html', student=student, current_enrollments=current_enrollments)
+        return render_template('update.html', student=student, current_enrollments=current_enrollments,
+                               courses=catalog.courses)
     
     if request.method == 'POST':
         f_name = request.form.get('f_name')
@@ -95,32 +155,53 @@ def update_student(student_id):
         student.first_name = f_name
         student.last_name = l_name
         
-        Enrollment.query.filter_by(estudent_id=student_id).delete()
-        
-        # --- MODIFIED SECTION ---
-        # Loop through the string values and get the integer ID from our map
-        for course_name in courses_from_form:
-            course_id = COURSE_MAP.get(course_name) # e.g., "course_2" -> 2
-            if course_id:
-                enrollment = Enrollment(estudent_id=student_id, ecourse_id=course_id)
-                db.session.add(enrollment)
+        # Only touch the enrollments that actually changed
+        current = {e.ecourse_id for e in student.enrollments}
+        submitted = selected_course_ids(courses_from_form)
+        removed = current - submitted
+        added = submitted - current
+        if removed:
+            Enrollment.query \
+                .filter(Enrollment.estudent_id == student_id, Enrollment.ecourse_id.in_(removed)) \
+                .delete(synchronize_session=False)
+        if added:
+            db.session.execute(db.insert(Enrollment), [
+                {'estudent_id': student_id, 'ecourse_id': course_id}
+                for course_id in sorted(added)
+            ])
         
         db.session.commit()
+        renderer.invalidate('_student_row.html', student_id)
         return redirect(url_for('index'))
 
 @app.route('/student/<int:student_id>/delete')
 def delete_student(student_id):
-    student = Student.query.get_or_404(student_id)
-    db.session.delete(student)
+    # Bulk deletes instead of loading every enrollment for the ORM cascade
+    Enrollment.query.filter_by(estudent_id=student_id).delete(synchronize_session=False)
+    deleted = Student.query.filter_by(student_id=student_id).delete(synchronize_session=False)
+    if not deleted:
+        db.session.rollback()
+        abort(404)
     db.session.commit()
+    renderer.invalidate('_student_row.html', student_id)
     return redirect(url_for('index'))
 
 @app.route('/student/<int:student_id>')
 def student_details(student_id):
-    student = Student.query.get_or_404(student_id)
-    enrollments = Enrollment.query.filter_by(estudent_id=student_id).all()
-    enrolled_courses = [Course.query.get(e.ecourse_id) for e in enrollments]
-    return render_template('details.html', student=student, courses=enrolled_courses)
+    # One query: the student left-joined to each enrolled course
+    rows = db.session.query(Student, Course) \
+        .outerjoin(Enrollment, Enrollment.estudent_id == Student.student_id) \
+        .outerjoin(Course, Course.course_id == Enrollment.ecourse_id) \
+        .filter(Student.student_id == student_id) \
+        .order_by(Enrollment.enrollment_id) \
+        .all()
+    if not rows:
+        abort(404)
+    student = rows[0][0]
+    enrolled_courses = [course for _, course in rows if course is not None]
+    version = (student_version(student),
+               [(course.course_code, course.course_name, course.course_description) for course in enrolled_courses])
+    return renderer.page('details.html', version, student=student, courses=enrolled_courses)
 
 if __name__ == '__main__':
     # This block must be empty except for the app.run() call
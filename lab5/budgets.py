@@ -0,0 +1,36 @@
+"""Query-count budgets for the lab5 routes, checked by ``python query_budget.py``."""
+DATABASE_ENV = 'LAB5_DATABASE_URI'
+
+# (method, url, form data, expected status, max statements). Redirects are
+# not followed, so only the route itself is counted.
+BUDGETS = [
+    ('GET', '/', None, 200, 1),
+    ('GET', '/student/create', None, 200, 0),
+    ('POST', '/student/create', {'roll': 'R4', 'f_name': 'D', 'courses': ['course_1', 'course_2']}, 302, 3),
+    ('POST', '/student/create', {'roll': 'R1', 'f_name': 'A'}, 200, 1),
+    ('GET', '/student/1', None, 200, 1),
+    ('GET', '/student/99', None, 404, 1),
+    ('GET', '/student/1/update', None, 200, 1),
+    ('POST', '/student/1/update', {'f_name': 'A', 'courses': ['course_2', 'course_3']}, 302, 4),
+    ('POST', '/student/1/update', {'f_name': 'A', 'courses': ['course_2', 'course_3']}, 302, 1),
+    ('GET', '/student/2/delete', None, 302, 2),
+    ('GET', '/student/99/delete', None, 404, 2),
+]
+
+
+def seed(db):
+    from app import Course, Enrollment, Student
+    db.session.add_all([
+        Student(student_id=1, roll_number='R1', first_name='A'),
+        Student(student_id=2, roll_number='R2', first_name='B'),
+        Student(student_id=3, roll_number='R3', first_name='C'),
+    ] + [
+        Course(course_id=i, course_code=f'CSE0{i}', course_name=f'Course {i}') for i in range(1, 5)
+    ])
+    db.session.add_all([Enrollment(estudent_id=s, ecourse_id=c) for s, c in [(1, 1), (1, 2), (2, 1)]])
+    db.session.commit()
+
+
+def warm_up(client):
+    """Budgets describe warm workers: load the course catalog up front"""
+    client.get('/student/create')
@@ -0,0 +1,53 @@
+"""In-process copy of the course table for the student forms.
+
+The create/update forms and their validation read the catalog from memory,
+so rendering or submitting a form costs no course queries. The copy is
+reloaded after ``invalidate()`` (hooked to Course inserts, updates and
+deletes made through the ORM) or once ``ttl`` seconds have passed, which
+also picks up courses added by other processes such as setup_db.py.
+"""
+import threading
+import time
+
+
+class CourseCatalog:
+    def __init__(self, load, ttl=60):
+        self._load = load
+        self.ttl = ttl
+        self._courses = ()
+        self._ids = frozenset()
+        self._expires = 0
+        self._lock = threading.Lock()
+
+    def invalidate(self):
+        self._expires = 0
+
+    def _refresh(self):
+        if time.monotonic() < self._expires:
+            return
+        with self._lock:
+            if time.monotonic() < self._expires:
+                return
+            self._courses = tuple(self._load())
+            self._ids = frozenset(course.course_id for course in self._courses)
+            self._expires = time.monotonic() + self.ttl
+
+    @property
+    def courses(self):
+        """Rows with course_id, course_code and course_name, ordered by id"""
+        self._refresh()
+        return self._courses
+
+    def course_ids(self, values):
+        """Set of known course IDs among submitted checkbox values.
+
+        Accepts both "course_2" and "2" for course 2; anything else is ignored.
+        """
+        self._refresh()
+        ids = set()
+        for value in values:
+            if value.startswith('course_'):
+                value = value[len('course_'):]
+            if value.isdigit() and int(value) in self._ids:
+                ids.add(int(value))
+        return ids
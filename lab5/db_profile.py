@@ -0,0 +1,66 @@
+"""Database engine profile shared by the lab apps.
+
+``configure`` must run before ``SQLAlchemy(app)``; it reads these
+environment variables (``<PREFIX>`` is LAB5 or LAB6):
+
+    <PREFIX>_DATABASE_URI      SQLAlchemy URI; defaults to the lab's SQLite file
+    <PREFIX>_DB_POOL_SIZE      connections kept per worker process (default 5)
+    <PREFIX>_DB_MAX_OVERFLOW   extra connections under bursts (default 10)
+    <PREFIX>_SQLITE_TUNING     set to 0 to skip the PRAGMAs below
+
+A lab whose SQL only some databases accept passes their SQLAlchemy dialect
+names as ``dialects``, and ``configure`` raises ValueError for a URI naming
+any other. Lab6 upserts (ON CONFLICT) and uses RETURNING, so it accepts
+sqlite and postgresql only; lab5 accepts any dialect.
+
+``install_pragmas`` then applies SQLITE_PRAGMAS to every new SQLite
+connection. WAL lets readers proceed while a writer commits, and
+busy_timeout makes writers queue for the lock instead of failing at once.
+
+lab5 and Lab6 each ship a copy of this module; check_shared.py at the
+repository root fails when the copies differ.
+"""
+from sqlalchemy import event
+from sqlalchemy.engine import make_url
+
+import settings
+
+SQLITE_PRAGMAS = {
+    'journal_mode': 'WAL',
+    'synchronous': 'NORMAL',
+    'busy_timeout': 5000,
+    'mmap_size': 256 * 1024 * 1024,
+    'cache_size': -64000,  # negative means KiB, so 64 MB
+    'foreign_keys': 'ON',
+}
+
+
+def configure(app, default_uri, env_prefix, dialects=None):
+    env = settings.reader(env_prefix)
+    uri = env('DATABASE_URI', default_uri)
+    dialect = make_url(uri).get_backend_name()
+    if dialects is not None and dialect not in dialects:
+        raise ValueError(f'{env_prefix}_DATABASE_URI uses {dialect}; '
+                         f'this app supports {", ".join(dialects)} only')
+    options = {}
+    if not uri.startswith('sqlite'):
+        options.update(pool_pre_ping=True, pool_recycle=1800)
+    if ':memory:' not in uri and uri not in ('sqlite://', 'sqlite:///'):
+        options.update(pool_size=int(env('DB_POOL_SIZE', 5)),
+                       max_overflow=int(env('DB_MAX_OVERFLOW', 10)))
+
+    app.config['SQLALCHEMY_DATABASE_URI'] = uri
+    app.config['SQLALCHEMY_ENGINE_OPTIONS'] = options
+    app.config['SQLITE_TUNING'] = env('SQLITE_TUNING', '1') != '0'
+
+
+def install_pragmas(app, engine):
+    if engine.dialect.name != 'sqlite' or not app.config['SQLITE_TUNING']:
+        return
+
+    @event.listens_for(engine, 'connect')
+    def set_sqlite_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        for name, value in SQLITE_PRAGMAS.items():
+            cursor.execute(f'PRAGMA {name}={value}')
+        cursor.close()
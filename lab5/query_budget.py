@@ -0,0 +1,87 @@
+"""Query-count budgets for the lab's routes.
+
+``assert_max_queries`` counts the SQL statements an engine runs inside a
+block and raises AssertionError (listing them) when a budget is exceeded, so
+it can be dropped into any test. Running this module checks every entry in
+the lab's budgets.py against a scratch database and exits non-zero on a
+regression:
+
+    python query_budget.py
+
+This file is shared between labs (see check_shared.py); the routes, their
+budgets and the seed data live in each lab's budgets.py.
+"""
+import os
+import sys
+import tempfile
+from contextlib import contextmanager
+
+from sqlalchemy import event
+
+# Transaction bookkeeping is not a query
+_IGNORED = ('BEGIN', 'COMMIT', 'ROLLBACK', 'SAVEPOINT', 'RELEASE')
+
+
+class QueryCounter:
+    """Records every statement executed on ``engine`` while active"""
+
+    def __init__(self, engine):
+        self.engine = engine
+        self.statements = []
+
+    def _record(self, conn, cursor, statement, parameters, context, executemany):
+        if not statement.lstrip().upper().startswith(_IGNORED):
+            self.statements.append(statement)
+
+    def __enter__(self):
+        event.listen(self.engine, 'before_cursor_execute', self._record)
+        return self
+
+    def __exit__(self, *exc):
+        event.remove(self.engine, 'before_cursor_execute', self._record)
+
+    @property
+    def count(self):
+        return len(self.statements)
+
+
+@contextmanager
+def assert_max_queries(engine, budget, label='block'):
+    with QueryCounter(engine) as counter:
+        yield counter
+    if counter.count > budget:
+        listing = '\n'.join(f'  {i}. {s}' for i, s in enumerate(counter.statements, 1))
+        raise AssertionError(f'{label} ran {counter.count} queries (budget {budget}):\n{listing}')
+
+
+def main():
+    sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+    import budgets
+
+    scratch = tempfile.mkdtemp()
+    os.environ[budgets.DATABASE_ENV] = 'sqlite:///' + os.path.join(scratch, 'budget.sqlite3')
+    from app import app, db
+
+    with app.app_context():
+        budgets.seed(db)
+        engine = db.engine
+    client = app.test_client()
+    budgets.warm_up(client)
+
+    failures = 0
+    for method, url, data, status, budget in budgets.BUDGETS:
+        label = f'{method} {url}'
+        try:
+            with assert_max_queries(engine, budget, label) as counter:
+                response = client.open(url, method=method, data=data)
+            assert response.status_code == status, \
+                f'{label} returned {response.status_code}, expected {status}'
+            print(f'ok   {label}: {counter.count}/{budget} queries')
+        except AssertionError as e:
+            failures += 1
+            print(f'FAIL {e}')
+    return 1 if failures else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,149 @@
+"""Cached template rendering for the lab apps.
+
+``Renderer(app, env_prefix)`` compiles every template at startup, with a
+Jinja bytecode cache on disk so later processes load compiled code instead
+of parsing templates again. Above that are two caches:
+
+* ``fragment(template, key, version, **context)``, also callable from
+  templates, renders a partial such as one table row and keeps the result
+  until the row's ``version`` changes or ``invalidate(template, key)`` drops
+  it. A page of rows then costs one dict lookup per unchanged row.
+* ``page(template, version, **context)`` answers with the whole page. Its
+  ETag is derived from ``version`` and the template sources, so GET requests
+  whose If-None-Match still holds get 304 without rendering. Rendered pages
+  are kept by ETag, along with a gzip copy once a client accepts one.
+
+Versions are any hashable value (typically the tuple of row values the
+output depends on), so a stale entry can never be served, even when another
+process changed the row. Settings (``<PREFIX>`` is LAB4 or LAB5):
+
+    <PREFIX>_TEMPLATE_CACHE_DIR   bytecode cache directory (default: Jinja's, in the temp dir)
+    <PREFIX>_FRAGMENT_CACHE_SIZE  cached fragments (default 100000)
+    <PREFIX>_PAGE_CACHE_MB        cached pages, in MB of HTML plus gzip (default 32)
+
+Lab4 and lab5 each ship a copy of this module; check_shared.py at the
+repository root fails when the copies differ.
+"""
+import gzip
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+
+from flask import Response, render_template, request
+from jinja2 import FileSystemBytecodeCache
+from markupsafe import Markup
+
+import settings
+
+GZIP_MIN_SIZE = 1024
+GZIP_LEVEL = 6
+
+
+class LRU:
+    """Thread-safe LRU bounded by total size, where ``sizeof`` gives each value's size"""
+
+    def __init__(self, max_size, sizeof=lambda value: 1):
+        self.max_size = max_size
+        self.size = 0
+        self.sizeof = sizeof
+        self._items = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            value = self._items.get(key)
+            if value is not None:
+                self._items.move_to_end(key)
+            return value
+
+    def put(self, key, value):
+        size = self.sizeof(value)
+        if size > self.max_size:
+            return
+        with self._lock:
+            old = self._items.pop(key, None)
+            if old is not None:
+                self.size -= self.sizeof(old)
+            self._items[key] = value
+            self.size += size
+            while self.size > self.max_size:
+                _, evicted = self._items.popitem(last=False)
+                self.size -= self.sizeof(evicted)
+
+    def pop(self, key):
+        with self._lock:
+            old = self._items.pop(key, None)
+            if old is not None:
+                self.size -= self.sizeof(old)
+
+
+class Renderer:
+    def __init__(self, app, env_prefix):
+        env = settings.reader(env_prefix)
+        directory = env('TEMPLATE_CACHE_DIR', None)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        jinja_env = app.jinja_env
+        jinja_env.bytecode_cache = FileSystemBytecodeCache(directory)
+
+        # Compile everything now rather than on each template's first request,
+        # and fold the sources into every ETag so a template change is a new version
+        digest = hashlib.sha1()
+        for name in sorted(jinja_env.list_templates()):
+            jinja_env.get_template(name)
+            digest.update(jinja_env.loader.get_source(jinja_env, name)[0].encode())
+        self.templates_version = digest.hexdigest()[:16]
+
+        self.fragments = LRU(int(env('FRAGMENT_CACHE_SIZE', 100000)))
+        self.pages = LRU(int(float(env('PAGE_CACHE_MB', 32)) * 1024 * 1024),
+                         sizeof=lambda page: len(page[0]) + len(page[1] or b''))
+        jinja_env.globals['fragment'] = self.fragment
+
+    def fragment(self, template_name, key, version, **context):
+        """``template_name`` rendered with ``context``, cached under ``key`` while ``version`` holds"""
+        cache_key = (template_name, request.script_root, key)
+        cached = self.fragments.get(cache_key)
+        if cached is not None and cached[0] == version:
+            return cached[1]
+        html = Markup(render_template(template_name, **context))
+        self.fragments.put(cache_key, (version, html))
+        return html
+
+    def invalidate(self, template_name, key):
+        """Drop the cached fragment, e.g. after the row it shows was written"""
+        self.fragments.pop((template_name, request.script_root, key))
+
+    def etag(self, template_name, version):
+        key = repr((self.templates_version, template_name, request.script_root, version))
+        return hashlib.sha1(key.encode()).hexdigest()[:16]
+
+    def page(self, template_name, version, **context):
+        """Whole-page response for ``template_name``, which renders the same for the same ``version``"""
+        etag = self.etag(template_name, version)
+        # The gzip and identity bodies are different representations, so they get different ETags
+        tags = (etag, f'{etag}-gzip')
+        conditional = request.method in ('GET', 'HEAD')
+        matched = next((tag for tag in tags if request.if_none_match.contains(tag)), None) if conditional else None
+        if matched is not None:
+            response = Response(status=304)
+            response.set_etag(matched)
+        else:
+            html, compressed = self.pages.get(etag) or (None, None)
+            if html is None:
+                html = render_template(template_name, **context).encode()
+                self.pages.put(etag, (html, None))
+            if len(html) >= GZIP_MIN_SIZE and 'gzip' in request.accept_encodings:
+                if compressed is None:
+                    compressed = gzip.compress(html, GZIP_LEVEL)
+                    self.pages.put(etag, (html, compressed))
+                response = Response(compressed, mimetype='text/html')
+                response.headers['Content-Encoding'] = 'gzip'
+                tag = tags[1]
+            else:
+                response = Response(html, mimetype='text/html')
+                tag = tags[0]
+            if conditional:
+                response.set_etag(tag)
+        response.vary.add('Accept-Encoding')
+        return response